@@ -1,47 +1,72 @@
 import pandas as pd
-import numpy as np
 from services.openai_client import embed_texts
-from utils.cache import load_cache, save_cache
+from services.embedding_providers import get_embedding_provider, get_local_provider, next_fallback_provider
+from utils.vector_index import VectorIndex
+from utils.tracing import traced, annotate
 
 HOOKS_CSV = "data/hooks.csv"
+HOOKS_INDEX = "hooks_index_v2"
 
 def load_hooks():
     df = pd.read_csv(HOOKS_CSV)
     return df.fillna("")
 
-def pick_top_hooks(topic_text, n=3):
+def load_hook_index(df, provider=None):
     """
-    Carga hooks, usa embeddings para medir similitud con el tema, 
-    utiliza caché para evitar recalcular y devuelve n adaptados.
+    Abre el índice vectorial persistente de hooks y embebe solo los hooks nuevos o editados.
+    Hay un índice por proveedor de embeddings; si el proveedor configurado falla
+    se usa el local y, si tampoco carga, hashing, para que hooks y tema siempre
+    compartan el mismo espacio vectorial. El índice recuerda su proveedor en `index.provider`.
     """
-    # 1. Cargar hooks
-    df = load_hooks()
-    templates = df["hook_text"].tolist()
-
-    # 2. Intentar cargar embeddings cacheados
-    cache_key = "hooks_embeddings_v1"
-    cache = load_cache(cache_key, ttl_seconds=60*60*24)  # 24h de vida
-
-    if cache:
-        print("⚡ Usando embeddings cacheados de hooks")
-        hook_embs = np.array(cache["embeddings"])
+    provider = provider or get_embedding_provider()
+    index = VectorIndex(f"{HOOKS_INDEX}_{provider.slug}", dim=provider.dim,
+                        embed_fn=lambda texts: embed_texts(texts, provider=provider, fallback=False))
+    ids = df["id"].tolist() if "id" in df.columns else list(range(len(df)))
+    try:
+        updated = index.sync(ids, df["hook_text"].tolist())
+    except Exception as e:
+        local = next_fallback_provider(provider)
+        if local is None:
+            raise
+        print(f"⚠️ Embeddings de hooks con {provider.name} fallaron ({e}); usando {local.name}")
+        return load_hook_index(df, provider=local)
+    index.provider = provider
+    annotate(hooks=len(ids), hooks_embedded=updated, provider=provider.slug)
+    if updated:
+        print(f"💡 Embeddings actualizados para {updated} hooks")
     else:
-        print("💡 Generando embeddings nuevos para hooks...")
-        hook_embs = embed_texts(templates)
-        save_cache(cache_key, {"embeddings": hook_embs.tolist()})
+        print("⚡ Usando índice de embeddings de hooks")
+    return index
 
-    # 3. Generar embedding del tema actual
-    topic_emb = embed_texts([topic_text])[0]
+@traced("pick_top_hooks")
+def pick_top_hooks(topic_text, n=3, df=None, index=None):
+    """
+    Carga hooks, usa embeddings para medir similitud con el tema, 
+    utiliza un índice persistente para evitar recalcular y devuelve n adaptados.
+    `df` e `index` permiten reutilizar hooks ya cargados entre varios temas.
+    """
+    # 1. Cargar hooks y sincronizar índice
+    if df is None:
+        df = load_hooks()
+    if index is None:
+        index = load_hook_index(df)
 
-    # 4. Calcular similitud coseno
-    sims = np.dot(hook_embs, topic_emb) / (
-        np.linalg.norm(hook_embs, axis=1) * np.linalg.norm(topic_emb) + 1e-9
-    )
+    # 2. Embedding del tema con el mismo proveedor del índice (local y luego hashing si falla)
+    while True:
+        try:
+            top = index.query_text(topic_text, k=n)
+            break
+        except Exception as e:
+            current = getattr(index, "provider", None)
+            local = next_fallback_provider(current) if current is not None else get_local_provider()
+            if local is None:
+                raise
+            print(f"⚠️ No se pudo embeber el tema ({e}); usando embeddings {local.name}")
+            index = load_hook_index(df, provider=local)
 
-    # 5. Obtener los n más similares
-    top_idxs = np.argsort(sims)[-n:][::-1]
+    # 3. Obtener los n más similares (coseno sobre vectores normalizados)
     selected = []
-    for i in top_idxs:
+    for i, sim in top:
         row = df.iloc[i].to_dict()
         template = row.get("hook_text", "")
         adapted = (
@@ -52,8 +77,8 @@ def pick_top_hooks(topic_text, n=3):
         selected.append({
             "id": row.get("id"),
             "hook": adapted.strip(),
-            "similarity": float(sims[i]),
+            "similarity": sim,
             "meta": row
         })
 
-    return selected
\ No newline at end of file
+    return selected
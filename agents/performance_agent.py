@@ -1,8 +1,13 @@
 import os
+import json
+import sqlite3
+import hashlib
+import threading
 import pandas as pd
-from utils.text_utils import extract_common_words
-from services.linkedin_scraper import load_exported_posts
-from utils.cache import load_cache, save_cache
+from utils.text_utils import extract_common_words, count_words, TOKEN_RE, STOPWORDS
+from services.linkedin_scraper import iter_exported_posts, list_export_files
+from utils.cache import load_cache, save_cache, CACHE_DIR
+from utils.tracing import traced, annotate
 
 def compute_engagement_score_local(post):
     likes = post.get("likes",0) or 0
@@ -12,28 +17,267 @@ def compute_engagement_score_local(post):
     score = (comments * 3 + shares * 4 + likes * 1) / max(impressions,1)
     return score
 
-def analyze_performance(posts_dir="data/posts", cache_ttl=60*60):
+NUMERIC_COLUMNS = ["likes", "comments", "shares", "impressions"]
+TEXT_COLUMNS = ["text", "date", "url"]
+
+def posts_to_frame(posts):
+    """
+    Convierte un bloque de posts (dicts) a un DataFrame con las columnas del análisis tipadas
+    (se agregan si faltan). Las demás columnas del export se conservan tal cual.
+    """
+    df = pd.DataFrame.from_records(posts)
+    for c in NUMERIC_COLUMNS:
+        if c in df.columns:
+            col = df[c]
+            if not pd.api.types.is_numeric_dtype(col):
+                # el export CSV trae números como texto, p.ej. "1,234"
+                col = col.astype(str).str.replace(",", "", regex=False)
+            df[c] = pd.to_numeric(col, errors='coerce').fillna(0).astype("float64")
+        else:
+            df[c] = 0.0
+    for c in TEXT_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].fillna("").astype(str)
+        else:
+            df[c] = ""
+    return df
+
+def load_posts_frame(posts_dir="data/posts", chunk_size=5000):
+    """Construye el DataFrame de posts de forma incremental, bloque a bloque."""
+    frames = [posts_to_frame(chunk) for chunk in iter_exported_posts(posts_dir, chunk_size=chunk_size)]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+DEFAULT_ENGAGEMENT_WEIGHTS = {"likes": 1, "comments": 3, "shares": 4}
+
+def validate_weights(weights):
+    """Los pesos solo pueden referirse a columnas numéricas (también se usan para armar SQL)."""
+    unknown = set(weights) - set(NUMERIC_COLUMNS)
+    if unknown:
+        raise ValueError(f"Pesos de engagement sobre columnas desconocidas: {sorted(unknown)}")
+    return weights
+
+def compute_engagement_scores(df, weights=None):
+    """
+    Versión vectorizada de compute_engagement_score_local: opera por columnas sobre el DataFrame.
+    `weights` permite ajustar el peso de likes/comments/shares.
+    """
+    weights = validate_weights(weights or DEFAULT_ENGAGEMENT_WEIGHTS)
+    interactions = sum(df[col] * w for col, w in weights.items())
+    return interactions / df["impressions"].clip(lower=1)
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# cambia si cambia el esquema del sidecar (se reconstruye desde el export)
+POST_STORE_SCHEMA = "2"
+# cambia si cambia el tokenizador o las stopwords (se recuentan las palabras desde la tabla posts)
+WORDS_VERSION = hashlib.sha1(
+    (TOKEN_RE.pattern + "\x00" + " ".join(sorted(STOPWORDS))).encode("utf-8")
+).hexdigest()[:12]
+CORE_COLUMNS = TEXT_COLUMNS + NUMERIC_COLUMNS
+
+def extra_fields(df):
+    """JSON por fila con las columnas del export que no son del análisis (sin valores vacíos)."""
+    extra_cols = [c for c in df.columns if c not in CORE_COLUMNS]
+    if not extra_cols:
+        return [None] * len(df)
+    out = []
+    for record in df[extra_cols].to_dict(orient="records"):
+        record = {k: v for k, v in record.items() if v is not None and not (isinstance(v, float) and v != v)}
+        out.append(json.dumps(record, ensure_ascii=False, default=str) if record else None)
+    return out
+
+class PostStore:
+    """
+    Sidecar SQLite con los posts ya puntuados del export:
+    - `files`: manifest (mtime, tamaño, hash) de cada archivo leído.
+    - `posts`: posts con engagement y longitud precalculados.
+    - `words`: conteo de palabras por archivo, para agregar sin releer textos.
+    - `meta`: pesos, versión del esquema y del tokenizador con que se contaron las palabras.
+    Al refrescar solo se procesan los archivos nuevos o modificados.
+    """
+
+    def __init__(self, posts_dir="data/posts", db_path=None):
+        self.posts_dir = os.path.abspath(posts_dir)
+        if db_path is None:
+            digest = hashlib.sha1(self.posts_dir.encode("utf-8")).hexdigest()[:16]
+            db_path = os.path.join(CACHE_DIR, f"posts_{digest}.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        if self._meta("schema") != POST_STORE_SCHEMA:
+            self._conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS posts; "
+                                     "DROP TABLE IF EXISTS words; DELETE FROM meta;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, hash TEXT);
+            CREATE TABLE IF NOT EXISTS posts (
+                file TEXT, text TEXT, date TEXT, url TEXT,
+                likes REAL, comments REAL, shares REAL, impressions REAL,
+                engagement REAL, length INTEGER, extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_posts_file ON posts(file);
+            CREATE INDEX IF NOT EXISTS idx_posts_engagement ON posts(engagement DESC);
+            CREATE TABLE IF NOT EXISTS words (file TEXT, word TEXT, count INTEGER);
+            CREATE INDEX IF NOT EXISTS idx_words_file ON words(file);
+        """)
+        self._set_meta("schema", POST_STORE_SCHEMA)
+        self._conn.commit()
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _delete_file(self, path):
+        self._conn.execute("DELETE FROM posts WHERE file = ?", (path,))
+        self._conn.execute("DELETE FROM words WHERE file = ?", (path,))
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _rescore(self, weights):
+        """Recalcula el engagement en SQL si cambiaron los pesos."""
+        weights_json = json.dumps(weights, sort_keys=True)
+        if self._meta("weights") == weights_json:
+            return
+        # validate_weights garantiza que solo se interpolan nombres de columnas conocidas
+        expr = " + ".join(f"{col} * ?" for col in validate_weights(weights))
+        self._conn.execute(
+            f"UPDATE posts SET engagement = ({expr}) / MAX(impressions, 1)", list(weights.values())
+        )
+        self._set_meta("weights", weights_json)
+
+    def _recount_words(self, batch=5000):
+        """Recuenta `words` desde los textos guardados si cambió el tokenizador o las stopwords."""
+        if self._meta("words_version") == WORDS_VERSION:
+            return
+        self._conn.execute("DELETE FROM words")
+        cursor = self._conn.execute("SELECT file, text FROM posts ORDER BY file")
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                break
+            self._insert_words(pd.DataFrame(rows, columns=["file", "text"]))
+        self._set_meta("words_version", WORDS_VERSION)
+
+    def _insert_words(self, df):
+        for path, texts in df.groupby("file", sort=False)["text"]:
+            self._conn.executemany(
+                "INSERT INTO words VALUES (?, ?, ?)",
+                [(path, w, c) for w, c in count_words(texts.tolist()).items()]
+            )
+
+    def refresh(self, weights=None, max_workers=8):
+        """Sincroniza el sidecar con el directorio de posts. Retorna el número de archivos reprocesados."""
+        weights = weights or DEFAULT_ENGAGEMENT_WEIGHTS
+        files = list_export_files(self.posts_dir)
+        with self._lock:
+            known = {p: (m, sz, h) for p, m, sz, h in self._conn.execute("SELECT path, mtime, size, hash FROM files")}
+            for path in set(known) - set(files):
+                self._delete_file(path)
+
+            changed = []
+            for path in files:
+                st = os.stat(path)
+                prev = known.get(path)
+                if prev and prev[0] == st.st_mtime and prev[1] == st.st_size:
+                    continue
+                digest = file_digest(path)
+                if prev and prev[2] == digest:
+                    self._conn.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                                       (st.st_mtime, st.st_size, path))
+                    continue
+                changed.append((path, st.st_mtime, st.st_size, digest))
+
+            self._rescore(weights)
+            self._recount_words()
+            if changed:
+                for path, *_ in changed:
+                    self._delete_file(path)
+                # mismo cargador por bloques que el análisis completo: memoria acotada por chunk_size
+                for paths, posts in iter_exported_posts(files=[c[0] for c in changed], max_workers=max_workers,
+                                                        with_source=True):
+                    df = posts_to_frame(posts)
+                    out = df[CORE_COLUMNS].copy()
+                    out["engagement"] = compute_engagement_scores(out, weights)
+                    out["length"] = out["text"].str.len()
+                    out["extra"] = extra_fields(df)
+                    out.insert(0, "file", paths)
+                    out.to_sql("posts", self._conn, if_exists="append", index=False)
+                    self._insert_words(out)
+                self._conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?)", changed)
+            self._conn.commit()
+        return len(changed)
+
+    def summary(self, top_n=20, words_n=25):
+        with self._lock:
+            counts, total_length = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM posts"
+            ).fetchone()
+            if not counts:
+                return {"top_posts": [], "avg_length":0, "common_words": [], "counts":0}
+            top = pd.read_sql_query(
+                "SELECT text, date, url, likes, comments, shares, impressions, engagement, length, extra "
+                "FROM posts ORDER BY engagement DESC LIMIT ?", self._conn, params=(top_n,)
+            )
+            words = self._conn.execute(
+                "SELECT word, SUM(count) AS c FROM words GROUP BY word ORDER BY c DESC LIMIT ?", (words_n,)
+            ).fetchall()
+        return {
+            "top_posts": [{**(json.loads(extra) if isinstance(extra, str) else {}), **post} for extra, post in
+                          zip(top.pop("extra"), top.to_dict(orient="records"))],
+            "avg_length": float(total_length) / counts,
+            "common_words": [(w, int(c)) for w, c in words],
+            "counts": int(counts)
+        }
+
+_stores = {}
+
+def get_post_store(posts_dir="data/posts"):
+    key = os.path.abspath(posts_dir)
+    if key not in _stores:
+        _stores[key] = PostStore(posts_dir)
+    return _stores[key]
+
+@traced("analyze_performance")
+def analyze_performance(posts_dir="data/posts", cache_ttl=60*60, weights=None, top_n=20, incremental=True):
+    """
+    Analiza el rendimiento de los posts exportados.
+    - incremental=True: usa el sidecar PostStore; solo re-puntúa archivos nuevos o modificados
+      y el resultado se actualiza en cuanto cambian los datos.
+    - incremental=False: recalcula todo y cachea el resultado durante `cache_ttl` segundos.
+    """
+    if incremental:
+        store = get_post_store(posts_dir)
+        updated = store.refresh(weights)
+        annotate(files_updated=updated)
+        if updated:
+            print(f"📊 Posts actualizados desde {updated} archivo(s) del export")
+        return store.summary(top_n=top_n)
+
     cache_key = f"perf_{os.path.abspath(posts_dir)}"
     cached = load_cache(cache_key, ttl_seconds=cache_ttl)
     if cached:
         return cached
 
-    posts = load_exported_posts(posts_dir)
-    if not posts:
+    df = load_posts_frame(posts_dir)
+    if df is None or df.empty:
         return {"top_posts": [], "avg_length":0, "common_words": [], "counts":0}
 
-    df = pd.DataFrame(posts)
-    # normalize numeric columns
-    for c in ["likes","comments","shares","impressions"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
-        else:
-            df[c] = 0
-    df["engagement"] = df.apply(lambda r: compute_engagement_score_local(r), axis=1)
-    df["length"] = df["text"].fillna("").apply(len)
-    top_posts = df.sort_values("engagement", ascending=False).head(20).to_dict(orient="records")
+    df["engagement"] = compute_engagement_scores(df, weights)
+    df["length"] = df["text"].str.len()
+    top_posts = df.nlargest(top_n, "engagement").to_dict(orient="records")
     avg_length = float(df["length"].mean())
-    common_words = extract_common_words(df["text"].fillna("").tolist(), top_n=25)
+    common_words = extract_common_words(df["text"].tolist(), top_n=25)
     out = {
         "top_posts": top_posts,
         "avg_length": avg_length,
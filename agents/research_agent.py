@@ -1,16 +1,60 @@
 # agents/research_agent.py
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from services.research_service import web_search, summarize_texts
+from services.source_fetcher import fetch_sources
 from utils.cache import load_cache, save_cache
 from utils.text_utils import normalize_text
+from utils.tracing import traced, annotate, bind_context
 
-def research_topic(user_topic: str, profile_data: dict, top_k=8, cache_ttl=60*60*24):
+def run_queries(queries, num=8, concurrent=True, max_workers=6, query_timeout=12, research_timeout=20):
+    """
+    Ejecuta las búsquedas y devuelve una lista de resultados por query, en el mismo orden de `queries`.
+    - concurrent=True: lanza todas las queries a la vez en un pool de hilos acotado.
+    - query_timeout: tiempo máximo por query, contado desde que se envía (no desde que se espera).
+    - research_timeout: tiempo máximo total; las queries que no respondan a tiempo se descartan.
+    """
+    if not concurrent:
+        return [web_search(q, num=num) for q in queries]
+
+    hits_by_query = [[] for _ in queries]
+    deadline = time.monotonic() + research_timeout
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries))))
+    try:
+        futures = []
+        for q in queries:
+            futures.append((executor.submit(bind_context(web_search), q, num),
+                            min(time.monotonic() + query_timeout, deadline)))
+        for idx, (fut, query_deadline) in enumerate(futures):
+            if not fut.done() and time.monotonic() >= deadline:
+                print(f"⏱️ Tiempo de investigación agotado, se omite: {queries[idx]}")
+                continue
+            try:
+                hits_by_query[idx] = fut.result(timeout=max(0.0, query_deadline - time.monotonic())) or []
+            except FuturesTimeout:
+                print(f"⏱️ Query sin respuesta a tiempo: {queries[idx]}")
+            except Exception as e:
+                print(f"Error en query '{queries[idx]}':", e)
+    finally:
+        # No bloquear por hilos lentos: se cancelan los pendientes y se dejan terminar en segundo plano
+        executor.shutdown(wait=False, cancel_futures=True)
+    return hits_by_query
+
+@traced("research_topic")
+def research_topic(user_topic: str, profile_data: dict, top_k=8, cache_ttl=60*60*24,
+                   concurrent=True, query_timeout=12, research_timeout=20,
+                   fetch_pages=5, fetch_timeout=10):
     """
     Agente 1 - Investigación:
     - Busca en la web usando queries relacionadas al topic + avatar del perfil.
+    - Con concurrent=True las queries se ejecutan en paralelo (latencia ~ la query más lenta).
+    - fetch_pages: cuántas fuentes (top-k) se descargan a texto completo en paralelo (0 = solo snippets);
+      la espera está acotada por fetch_timeout sin importar cuántas sean.
     - Resume y retorna insights.
     """
     cache_key = f"research_{user_topic.replace(' ','_')}"
     cached = load_cache(cache_key, ttl_seconds=cache_ttl)
+    annotate(topic=user_topic, cache_hit=bool(cached))
     if cached:
         return cached
 
@@ -23,11 +67,17 @@ def research_topic(user_topic: str, profile_data: dict, top_k=8, cache_ttl=60*60
         f"{user_topic} problemas comunes"
     ]
     results = []
-    for q in queries:
-        hits = web_search(q, num=top_k)
+    for hits in run_queries(queries, num=top_k, concurrent=concurrent,
+                            query_timeout=query_timeout, research_timeout=research_timeout):
         results.extend(hits)
     snippets = [normalize_text(r.get("snippet","")) for r in results if r.get("snippet")]
-    summary = summarize_texts(snippets, max_sentences=6)
+    pages = []
+    if fetch_pages:
+        links = list(dict.fromkeys(r.get("link") for r in results if r.get("link")))[:fetch_pages]
+        pages = fetch_sources(links, timeout=fetch_timeout)
+    summary = summarize_texts(snippets + [normalize_text(p["text"]) for p in pages], max_sentences=6)
+    annotate(results=len(results), pages=len(pages),
+             snippet_bytes=sum(len(s.encode("utf-8")) for s in snippets))
     out = {
         "topic": user_topic,
         "summary": summary,
@@ -1,10 +1,143 @@
+import os
+import re
 import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field, asdict
 from datetime import datetime
-from services.openai_client import generate_text
+from services.openai_client import generate_text, generate_text_stream, json_schema_format
+from utils.cache import CACHE_DIR
+from utils.json_stream import StreamingJsonObjectParser
 from utils.text_utils import ask_option
+from utils.tracing import traced, annotate
 
 from utils.path import get_path
 
+SCRIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "content": {"type": "string"},
+        "cta": {"type": "string"},
+        "hashtags": {"type": "array", "items": {"type": "string"}},
+        "prompt_for_image": {"type": "string"}
+    },
+    "required": ["title", "content", "cta", "hashtags", "prompt_for_image"],
+    "additionalProperties": False
+}
+
+REQUIRED_FIELDS = ("title", "content")
+# campos que no justifican una llamada de reparación por sí solos
+OPTIONAL_FIELDS = ("hashtags",)
+STATS_DB = os.path.join(CACHE_DIR, "script_stats.sqlite")
+
+@dataclass
+class PostScript:
+    """Guion validado de un post."""
+    title: str = ""
+    content: str = ""
+    cta: str = ""
+    hashtags: list = field(default_factory=list)
+    prompt_for_image: str = ""
+
+    @classmethod
+    def validate(cls, data):
+        """
+        Construye un PostScript a partir de un dict y retorna (script, campos inválidos).
+        Acepta `content` como lista de párrafos y `hashtags` como string separado por espacios.
+        """
+        script, invalid = cls(), []
+        data = data if isinstance(data, dict) else {}
+        for name in ("title", "content", "cta", "prompt_for_image"):
+            value = data.get(name)
+            if name == "content" and isinstance(value, list):
+                value = "\n\n".join(str(p).strip() for p in value)
+            if isinstance(value, str) and value.strip():
+                setattr(script, name, value.strip())
+            else:
+                invalid.append(name)
+        tags = data.get("hashtags")
+        if isinstance(tags, str):
+            tags = tags.split()
+        if isinstance(tags, list):
+            script.hashtags = [t if str(t).startswith("#") else f"#{t}" for t in map(str, tags) if t]
+        else:
+            invalid.append("hashtags")
+        return script, invalid
+
+    def to_dict(self):
+        return asdict(self)
+
+_stats_conn = None
+_stats_lock = threading.Lock()
+
+def _stats_db():
+    # tabla propia (fuera de la caché general): no se evicta y el incremento es atómico en SQL
+    global _stats_conn
+    if _stats_conn is None:
+        conn = sqlite3.connect(STATS_DB, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS parse_stats (event TEXT PRIMARY KEY, n INTEGER NOT NULL)")
+        conn.commit()
+        _stats_conn = conn
+    return _stats_conn
+
+def record_parse_event(event):
+    """Cuenta cuántas veces ocurre cada resultado del parseo (ok, regex, reparado, raw)."""
+    with _stats_lock:
+        conn = _stats_db()
+        conn.execute("INSERT INTO parse_stats VALUES (?, 1) "
+                     "ON CONFLICT(event) DO UPDATE SET n = n + 1", (event,))
+        conn.commit()
+
+def get_parse_stats():
+    """Conteo acumulado por resultado del parseo (visible en `--runs` y en GET /health del servicio)."""
+    with _stats_lock:
+        return dict(_stats_db().execute("SELECT event, n FROM parse_stats").fetchall())
+
+def parse_script_response(response):
+    """Parsea la respuesta del modelo: JSON directo y, si falla, extracción del objeto por regex."""
+    try:
+        return json.loads(response), "ok"
+    except (json.JSONDecodeError, TypeError):
+        pass
+    m = re.search(r'(\{.*\})', response or "", flags=re.S)
+    if m:
+        try:
+            return json.loads(m.group(1)), "regex"
+        except json.JSONDecodeError:
+            pass
+    return {}, "unparsed"
+
+def repair_script(script: PostScript, invalid, context_prompt):
+    """
+    Pasada de reparación: pide al modelo solo los campos inválidos, con el resto del guion como contexto.
+    """
+    schema = {
+        "type": "object",
+        "properties": {k: SCRIPT_SCHEMA["properties"][k] for k in invalid},
+        "required": list(invalid),
+        "additionalProperties": False
+    }
+    prompt = f"""
+    Completa únicamente los campos faltantes de este post de LinkedIn: {', '.join(invalid)}.
+    Guion actual: {json.dumps(script.to_dict(), ensure_ascii=False)}
+
+    Instrucciones originales:
+    {context_prompt}
+
+    Devuelve solo un JSON con los campos pedidos.
+    """
+    max_tokens = 700 if "content" in invalid else 200
+    response = generate_text(prompt, max_tokens=max_tokens,
+                             response_format=json_schema_format("post_script_repair", schema))
+    fixed, _ = parse_script_response(response)
+    if not isinstance(fixed, dict):
+        # la reparación no devolvió un objeto: se conserva el guion original
+        return script, list(invalid)
+    merged = {**script.to_dict(), **{k: v for k, v in fixed.items() if k in invalid}}
+    return PostScript.validate(merged)
+
 def load_templates():
     """Carga las plantillas de guion desde el archivo JSON"""
     filepath = get_path("data/templates.json")
@@ -34,9 +167,45 @@ def select_template(templates):
         else:
             print("\n🔁 Volviendo a mostrar las opciones...\n")
 
-def build_script_with_template(research_insights: dict, perf: dict, profile_data: dict):
-    templates = load_templates()
-    selected_template = select_template(templates)
+def find_template(templates, key):
+    """Busca una plantilla por id o por nombre (modo no interactivo)."""
+    for t in templates:
+        if key in (t.get("id"), t.get("name")):
+            return t
+    raise ValueError(f"Plantilla no encontrada: {key}")
+
+def stream_script(prompt, max_tokens=700, response_format=None):
+    """
+    Genera el guion en streaming: muestra el contenido a medida que llega y
+    parsea el JSON de forma incremental. Retorna (campos parseados, texto completo).
+    """
+    parser = StreamingJsonObjectParser()
+    parts = []
+    streaming_key = None
+    for chunk in generate_text_stream(prompt, max_tokens=max_tokens, response_format=response_format):
+        parts.append(chunk)
+        for kind, key, value in parser.feed(chunk):
+            if kind == "delta" and key in ("title", "content"):
+                if streaming_key != key:
+                    print("\n" if streaming_key else "", end="")
+                    streaming_key = key
+                print(value, end="", flush=True)
+            elif kind == "field" and key in ("title", "content"):
+                streaming_key = None
+                print()
+    return parser.fields, "".join(parts)
+
+@traced("build_script_with_template")
+def build_script_with_template(research_insights: dict, perf: dict, profile_data: dict,
+                               template: dict = None, stream: bool = False, structured: bool = True):
+    """
+    Genera el guion del post. Si no se pasa `template`, se pide al usuario que seleccione una.
+    Con stream=True el post se imprime mientras se genera.
+    Con structured=True se pide salida con JSON schema; los campos inválidos se reparan
+    con una llamada corta en lugar de regenerar todo el post.
+    Si la reparación falla retorna {"raw": respuesta}; los llamadores lo detectan con script_failed.
+    """
+    selected_template = template or select_template(load_templates())
 
     template_text = selected_template["structure"]
     current_date = datetime.now().strftime("%d/%m/%Y")
@@ -72,20 +241,50 @@ def build_script_with_template(research_insights: dict, perf: dict, profile_data
     }}
     """
 
-    response = generate_text(prompt, max_tokens=700)
-    try:
-        import re
-        m = re.search(r'(\{.*\})', response, flags=re.S)
-        json_str = m.group(1) if m else response
-        return json.loads(json_str)
-    except Exception:
-        return {"raw": response}
+    response_format = json_schema_format("post_script", SCRIPT_SCHEMA) if structured else None
+    if stream:
+        fields, response = stream_script(prompt, max_tokens=700, response_format=response_format)
+        outcome = "ok"
+        if not fields:
+            fields, outcome = parse_script_response(response)
+    else:
+        response = generate_text(prompt, max_tokens=700, response_format=response_format)
+        fields, outcome = parse_script_response(response)
+
+    script, invalid = PostScript.validate(fields)
+    annotate(parse_outcome=outcome, invalid_fields=len(invalid))
+    if invalid and all(f in OPTIONAL_FIELDS for f in invalid):
+        # solo faltan hashtags: el post se publica sin ellos en lugar de pagar otra llamada
+        record_parse_event(f"{outcome}_without_hashtags")
+    elif invalid:
+        record_parse_event(f"invalid_{outcome}")
+        print(f"🔧 Reparando campos del guion: {', '.join(invalid)}")
+        script, invalid = repair_script(script, invalid, prompt)
+        if any(f in invalid for f in REQUIRED_FIELDS):
+            record_parse_event("raw_fallback")
+            return {"raw": response}
+        record_parse_event("repaired")
+    else:
+        record_parse_event(outcome)
+    return script.to_dict()
+
+def script_failed(script) -> bool:
+    """
+    True si el guion no se pudo generar ni reparar: build_script_with_template devolvió
+    {"raw": respuesta} o faltan título/contenido. Ese guion no se publica.
+    """
+    if not isinstance(script, dict) or "raw" in script:
+        return True
+    return not all(isinstance(script.get(f), (str, list)) and script.get(f) for f in REQUIRED_FIELDS)
 
 def build_post_content(script: dict) -> str:
     """
     Construye el contenido final del post de LinkedIn a partir del guion generado por el agente.
     Retorna un texto listo para publicar en LinkedIn.
+    Lanza ValueError si el guion falló (ver script_failed): no hay post que publicar.
     """
+    if script_failed(script):
+        raise ValueError("El guion no tiene título y contenido válidos; no se puede armar el post")
     # Extraer partes del guion
     title = script.get("title", "").strip()
     structure = script.get("content", [])
@@ -0,0 +1,320 @@
+import os
+import sys
+import hmac
+import json
+import asyncio
+import secrets
+import traceback
+from http import HTTPStatus
+from dotenv import load_dotenv
+
+# Permite ejecutar el script directamente (python api/generation_server.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 🔹 Cargar variables de entorno
+load_dotenv()
+
+HOST = os.getenv("GENERATION_SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("GENERATION_SERVER_PORT", 8010))
+MAX_CONCURRENT_DRAFTS = int(os.getenv("MAX_CONCURRENT_DRAFTS", 4))
+MAX_BODY_BYTES = 1024 * 1024
+# Token compartido para las rutas POST (header `Authorization: Bearer <token>`).
+# Si no se define, se genera uno por proceso y se muestra al iniciar.
+SERVER_TOKEN = os.getenv("GENERATION_SERVER_TOKEN")
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# ==========================
+# 🔹 Estado caliente
+# ==========================
+class GenerationService:
+    """
+    Mantiene en memoria lo que cada ejecución de main.py recargaba: perfil, plantillas,
+    hooks con su índice de embeddings, la conexión Runware y los pools HTTP.
+    Los borradores se generan en hilos, hasta MAX_CONCURRENT_DRAFTS a la vez.
+    """
+
+    def __init__(self, profile_path="data/profile_data.json"):
+        self.profile_path = profile_path
+        self.drafts = asyncio.Semaphore(MAX_CONCURRENT_DRAFTS)
+        self.profile = None
+        self.templates = None
+        self.hooks_df = None
+        self.hook_index = None
+        self._runware = None
+        self._runware_users = {}
+        self._runware_lock = asyncio.Lock()
+
+    async def warm_up(self):
+        def load():
+            from main import load_profile
+            from agents.script_agent import load_templates
+            from agents.hook_agent import load_hooks, load_hook_index
+            self.profile = load_profile(self.profile_path)
+            self.templates = load_templates()
+            self.hooks_df = load_hooks()
+            self.hook_index = load_hook_index(self.hooks_df)
+        await asyncio.to_thread(load)
+        print(f"🔥 Servicio listo: {len(self.templates)} plantillas, {len(self.hooks_df)} hooks")
+
+    def template(self, key):
+        from agents.script_agent import find_template
+        if not key:
+            raise HttpError(400, "Falta 'template' (id o nombre)")
+        try:
+            return find_template(self.templates, key)
+        except ValueError as e:
+            raise HttpError(404, str(e))
+
+    async def acquire_runware(self):
+        """
+        Conexión Runware compartida, con conteo de usuarios. Devolverla con release_runware.
+        """
+        from services.generate_image import connect_runware
+        async with self._runware_lock:
+            if self._runware is None:
+                self._runware = await connect_runware()
+            runware = self._runware
+            self._runware_users[runware] = self._runware_users.get(runware, 0) + 1
+            return runware
+
+    async def release_runware(self, runware, broken=False):
+        """
+        Con broken=True la conexión deja de entregarse y la próxima petición abre otra.
+        Una conexión reemplazada se cierra cuando la suelta su último usuario, así un fallo
+        no corta las imágenes que otras peticiones están generando con ella.
+        """
+        async with self._runware_lock:
+            self._runware_users[runware] -= 1
+            if broken and self._runware is runware:
+                self._runware = None
+            if runware is self._runware or self._runware_users[runware] > 0:
+                return
+            del self._runware_users[runware]
+        try:
+            await runware.disconnect()
+        except Exception:
+            pass
+
+    async def close(self):
+        from services import http_client
+        for runware in set(self._runware_users) | ({self._runware} - {None}):
+            try:
+                await runware.disconnect()
+            except Exception:
+                pass
+        await http_client.aclose()
+
+    # ---------- endpoints ----------
+    async def health(self, _body):
+        from agents.script_agent import get_parse_stats
+        return {"ok": True, "warm": self.hook_index is not None,
+                "parse_stats": await asyncio.to_thread(get_parse_stats)}
+
+    async def flow(self, body):
+        topic = (body.get("topic") or "").strip()
+        if not topic:
+            raise HttpError(400, "Falta 'topic'")
+        template = self.template(body.get("template"))
+
+        def run():
+            from main import run_flow
+            from agents.script_agent import build_post_content, script_failed
+            out = run_flow(topic, profile=self.profile, template=template, hooks_df=self.hooks_df,
+                           hook_index=self.hook_index, stream=False)
+            if script_failed(out.get("script")):
+                out["post_text"] = None
+                out["error"] = "No se pudo generar un guion válido"
+            else:
+                out["post_text"] = build_post_content(out["script"])
+            return out
+
+        async with self.drafts:
+            return await asyncio.to_thread(run)
+
+    async def script(self, body):
+        template = self.template(body.get("template"))
+        research = body.get("research") or {}
+        perf = body.get("performance")
+
+        def run():
+            from agents.script_agent import build_script_with_template, build_post_content, script_failed
+            from agents.performance_agent import analyze_performance
+            script = build_script_with_template(research, perf or analyze_performance(),
+                                                body.get("profile") or self.profile, template=template)
+            if script_failed(script):
+                raise HttpError(502, "No se pudo generar un guion válido")
+            return {"script": script, "post_text": build_post_content(script)}
+
+        async with self.drafts:
+            return await asyncio.to_thread(run)
+
+    async def images(self, body):
+        from services.generate_image import generate_images_with_runware
+        prompts = body.get("prompts") or []
+        if not prompts or not all(isinstance(p, str) and p.strip() for p in prompts):
+            raise HttpError(400, "'prompts' debe ser una lista de textos")
+        errors = []
+        runware = await self.acquire_runware()
+        broken = True
+        try:
+            files = await generate_images_with_runware(prompts, wait_seconds=0, runware=runware,
+                                                        fresh=bool(body.get("fresh")), errors=errors)
+            # los fallos por prompt no se propagan: ante cualquiera se reemplaza la conexión
+            # por si se cayó (las peticiones que la siguen usando terminan con ella)
+            broken = bool(errors)
+        finally:
+            await self.release_runware(runware, broken=broken)
+        # `images` va alineado con `prompts` (None si falló); los errores llegan en el mismo orden
+        missing = [i for i, f in enumerate(files) if f is None]
+        return {"images": files,
+                "failed": [{"index": i, "prompt": p, "error": str(e)} for i, (p, e) in zip(missing, errors)]}
+
+    async def publish(self, body):
+        text = (body.get("text") or "").strip()
+        if not text:
+            raise HttpError(400, "Falta 'text'")
+        image_path = body.get("image_path")
+        if image_path:
+            image_path = allowed_image_path(image_path)
+
+        def run():
+            from services.linkedin_service import publish_post
+            return publish_post(text, image_path, mode=body.get("mode", "personal"))
+
+        return {"post": await asyncio.to_thread(run)}
+
+def allowed_image_path(image_path):
+    """Solo se publican imágenes del ImageStore (data/images); evita subir archivos arbitrarios."""
+    from services.image_store import get_image_store
+    if not isinstance(image_path, str):
+        raise HttpError(400, "'image_path' debe ser texto")
+    root = os.path.realpath(get_image_store().images_dir)
+    path = os.path.realpath(image_path)
+    if os.path.commonpath([root, path]) != root:
+        raise HttpError(403, "'image_path' debe estar dentro del directorio de imágenes")
+    if not os.path.isfile(path):
+        raise HttpError(400, f"No existe la imagen: {image_path}")
+    return path
+
+# ==========================
+# 🔹 HTTP/JSON sobre asyncio
+# ==========================
+ROUTES = {
+    ("GET", "/health"): "health",
+    ("POST", "/flow"): "flow",
+    ("POST", "/script"): "script",
+    ("POST", "/images"): "images",
+    ("POST", "/publish"): "publish",
+}
+
+async def read_request(reader):
+    """Lee una petición HTTP/1.1. Retorna (método, ruta, headers, body) o None si se cerró la conexión."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Petición inválida")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Body demasiado grande")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?")[0], headers, body
+
+async def write_response(writer, status, payload, keep_alive):
+    data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    reason = HTTPStatus(status).phrase
+    head = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+
+def check_token(headers, token):
+    scheme, _, value = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(value.strip().encode(), token.encode()):
+        raise HttpError(401, "Token inválido o ausente (Authorization: Bearer <token>)")
+
+def parse_body(method, headers, raw):
+    """Las rutas POST solo aceptan un objeto JSON con Content-Type application/json."""
+    if method != "POST":
+        return {}
+    if headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+        raise HttpError(415, "Content-Type debe ser application/json")
+    try:
+        body = json.loads(raw) if raw else {}
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise HttpError(400, "El body debe ser JSON")
+    if not isinstance(body, dict):
+        raise HttpError(400, "El body debe ser un objeto JSON")
+    return body
+
+def make_handler(service, token):
+    async def handle(reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, raw = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    endpoint = ROUTES.get((method, path))
+                    if endpoint is None:
+                        raise HttpError(404, f"Ruta no encontrada: {method} {path}")
+                    if method == "POST":
+                        check_token(headers, token)
+                    body = parse_body(method, headers, raw)
+                    status, payload = 200, await getattr(service, endpoint)(body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    traceback.print_exc()
+                    status, payload = 500, {"error": str(e)}
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+    return handle
+
+async def serve(host=HOST, port=PORT, token=SERVER_TOKEN):
+    service = GenerationService()
+    await service.warm_up()
+    if not token:
+        token = secrets.token_urlsafe(32)
+        print(f"🔐 GENERATION_SERVER_TOKEN no definido; token de esta sesión: {token}")
+    server = await asyncio.start_server(make_handler(service, token), host, port)
+    print(f"🌐 Servicio de generación escuchando en http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+def run_server():
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("👋 Servicio detenido")
+
+if __name__ == "__main__":
+    run_server()
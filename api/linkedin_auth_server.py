@@ -1,9 +1,13 @@
 import os
+import sys
 import secrets
-import requests
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
+
+# Permite ejecutar el script directamente (python api/linkedin_auth_server.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services import http_client
 import urllib.parse
 import uuid
 
@@ -51,7 +55,7 @@ def get_access_token(code):
         "client_id": CLIENT_ID,
         "client_secret": CLIENT_SECRET,
     }
-    response = requests.post(TOKEN_URL, headers=HEADERS, data=data)
+    response = http_client.post(TOKEN_URL, headers=HEADERS, data=data)
     if response.status_code != 200:
         raise Exception(f"Error al obtener access token: {response.status_code}, {response.text}")
     return response.json()
@@ -63,7 +67,7 @@ def get_linkedin_profile(access_token):
         "Authorization": f"Bearer {access_token}",
         "User-Agent": "python-script"
     }
-    response = requests.get(url, headers=headers)
+    response = http_client.get(url, headers=headers)
     if response.status_code != 200:
         raise Exception(f"Error al obtener perfil: {response.status_code}, {response.text}")
     return response.json()
@@ -85,7 +89,7 @@ def get_admin_organizations(access_token):
         "X-Restli-Protocol-Version": "2.0.0"
     }
 
-    resp = requests.get(url, headers=headers, params=params)
+    resp = http_client.get(url, headers=headers, params=params)
     if resp.status_code != 200:
         raise Exception(f"Error al obtener organizaciones: {resp.status_code}, {resp.text}")
     
@@ -0,0 +1,45 @@
+# benchmarks/bench_engagement.py
+"""
+Compara el cálculo de engagement fila a fila (df.apply) contra la versión vectorizada.
+Uso: python -m benchmarks.bench_engagement [--sizes 10000 100000 1000000]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from agents.performance_agent import compute_engagement_score_local, compute_engagement_scores
+
+def make_posts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "likes": rng.integers(0, 500, n).astype(float),
+        "comments": rng.integers(0, 80, n).astype(float),
+        "shares": rng.integers(0, 40, n).astype(float),
+        "impressions": rng.integers(0, 20000, n).astype(float),
+        "text": ["post"] * n,
+    })
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def run(sizes, apply_limit):
+    print(f"{'posts':>10} {'apply (s)':>12} {'vector (s)':>12} {'speedup':>10}")
+    for n in sizes:
+        df = make_posts(n)
+        fast, t_vec = timed(lambda: compute_engagement_scores(df))
+        if n <= apply_limit:
+            slow, t_apply = timed(lambda: df.apply(lambda r: compute_engagement_score_local(r), axis=1))
+            assert np.allclose(slow.to_numpy(), fast.to_numpy())
+            print(f"{n:>10} {t_apply:>12.4f} {t_vec:>12.4f} {t_apply / t_vec:>9.0f}x")
+        else:
+            print(f"{n:>10} {'(omitido)':>12} {t_vec:>12.4f} {'-':>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--apply-limit", type=int, default=1_000_000,
+                        help="Tamaño máximo para medir la versión df.apply (es lenta)")
+    args = parser.parse_args()
+    run(args.sizes, args.apply_limit)
@@ -0,0 +1,204 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark offline del pipeline completo y de cada agente, con fixtures grabadas (sin red ni API keys).
+Reporta percentiles de latencia, pico de memoria asignada y tasa de aciertos de caché.
+Antes de cada escenario se vacían las cachés: `cold_ms` es la primera iteración (trabajo real)
+y las siguientes miden el camino con cachés calientes.
+
+Uso:
+    python -m benchmarks.bench_pipeline                       # replay con latencias simuladas
+    python -m benchmarks.bench_pipeline --no-latency -n 20    # solo costo de CPU local
+    python -m benchmarks.bench_pipeline --record              # graba fixtures nuevas (requiere API keys)
+"""
+import argparse
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_FILE = os.path.join(ROOT_DIR, "benchmarks", "fixtures", "fixtures.json")
+
+def prepare_environment(record):
+    """Caché aislada en un directorio temporal y claves falsas para el modo replay."""
+    workdir = tempfile.mkdtemp(prefix="bench_linkedin_")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.makedirs(os.environ["CACHE_DIR"], exist_ok=True)
+    if not record:
+        for var in ("OPENAI_API_KEY", "RUNWARE_API_KEY", "LINKEDIN_ACCESS_TOKEN", "SERPAPI_KEY"):
+            os.environ.setdefault(var, "bench-offline")
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    return workdir
+
+def write_posts(directory, n, seed=0):
+    rng = random.Random(seed)
+    words = "automatización equipo arquitectura datos python cloud liderazgo scrum deuda técnica".split()
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n):
+        post = {
+            "text": " ".join(rng.choices(words, k=rng.randint(40, 160))),
+            "likes": rng.randint(0, 400), "comments": rng.randint(0, 60),
+            "shares": rng.randint(0, 30), "impressions": rng.randint(100, 20000),
+        }
+        with open(os.path.join(directory, f"post_{i:05d}.json"), "w", encoding="utf-8") as f:
+            json.dump(post, f, ensure_ascii=False)
+    return directory
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[k]
+
+def cache_counts(trace):
+    hits = misses = 0
+    for s in trace.spans:
+        hits += s.attrs.get("cache_hits", 0)
+        misses += s.attrs.get("cache_misses", 0) + s.attrs.get("api_texts", 0)
+    return hits, misses
+
+_cache_generation = itertools.count(1)
+
+def reset_caches(workdir):
+    """
+    Deja vacías la caché general, la de embeddings, el sidecar de posts, el índice de hooks
+    y el image store, para que la siguiente iteración haga el trabajo completo.
+    """
+    from utils import cache, embedding_cache
+    from agents import performance_agent
+    from services import image_store
+    cache_dir = os.path.join(workdir, f"cache_{next(_cache_generation)}")
+    os.makedirs(cache_dir)
+    cache._cache = cache.TieredCache(cache.SQLiteBackend(os.path.join(cache_dir, "cache.sqlite")), sweep_interval=0)
+    embedding_cache._cache = embedding_cache.EmbeddingCache(os.path.join(cache_dir, "embeddings.sqlite"))
+    performance_agent.CACHE_DIR = cache_dir
+    performance_agent._stores.clear()
+    for path in glob.glob(os.path.join(cache.CACHE_DIR, "hooks_index_*")):
+        os.remove(path)
+    image_store._store = image_store.ImageStore(os.path.join(cache_dir, "images"))
+
+def run_scenario(name, fn, iterations, measure_memory, verbose, reset=None):
+    from utils.tracing import start_trace
+    if reset:
+        with contextlib.redirect_stdout(io.StringIO()):
+            reset()
+    latencies, peaks = [], []
+    hits = misses = 0
+    for _ in range(iterations):
+        out = io.StringIO()
+        redirect = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(out)
+        if measure_memory:
+            tracemalloc.start()
+        with redirect, start_trace(name) as trace:
+            t0 = time.perf_counter()
+            fn()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        if measure_memory:
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+            tracemalloc.stop()
+        h, m = cache_counts(trace)
+        hits, misses = hits + h, misses + m
+    return {
+        "scenario": name,
+        "iterations": iterations,
+        "cold_ms": round(latencies[0], 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p90_ms": round(percentile(latencies, 90), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "peak_mb": round(max(peaks), 2) if peaks else None,
+        "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
+def build_scenarios(workdir, posts):
+    from services import http_client
+    import main
+    from agents.research_agent import research_topic
+    from agents.performance_agent import analyze_performance
+    from agents.script_agent import build_script_with_template, load_templates
+    from agents.hook_agent import pick_top_hooks
+    from services.generate_image import generate_images_with_runware
+    from services.linkedin_service import create_post_with_generated_image
+    from services import image_store
+
+    # imágenes fuera del repo: image store propio del benchmark
+    images_dir = os.path.join(workdir, "images")
+    image_store._store = image_store.ImageStore(images_dir)
+    # `research` y `perf` solo alimentan a build_script; reset_caches los descarta antes de cada escenario
+
+    topic = "Automatización práctica con n8n"
+    profile = main.load_profile()
+    template = load_templates()[0]
+    posts_dir = write_posts(os.path.join(workdir, "posts"), posts)
+    research = research_topic(topic, profile)
+    perf = analyze_performance(posts_dir)
+    prompts = ["Ilustración de engranajes azules", "Equipo remoto revisando métricas", "Diagrama de microservicios"]
+
+    return [
+        ("research_topic", lambda: research_topic(topic, profile)),
+        ("analyze_performance", lambda: analyze_performance(posts_dir)),
+        ("pick_top_hooks", lambda: pick_top_hooks(topic, n=3)),
+        ("build_script", lambda: build_script_with_template(research, perf, profile, template=template)),
+        ("run_flow", lambda: main.run_flow(topic, template=template, stream=False, posts_dir=posts_dir)),
+        ("generate_images", lambda: http_client.run(generate_images_with_runware(prompts, wait_seconds=0, output_dir=images_dir))),
+        ("publish", lambda: create_post_with_generated_image("Post de benchmark", [prompts[0]], mode="personal")),
+    ]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline")
+    parser.add_argument("-n", "--iterations", type=int, default=5)
+    parser.add_argument("--posts", type=int, default=500, help="Posts sintéticos para analyze_performance")
+    parser.add_argument("--only", nargs="*", help="Escenarios a ejecutar")
+    parser.add_argument("--no-latency", action="store_true", help="Sin latencias simuladas de red")
+    parser.add_argument("--runware-latency-ms", type=int, default=1500)
+    parser.add_argument("--memory", action="store_true", help="Medir pico de memoria con tracemalloc")
+    parser.add_argument("--record", action="store_true", help="Grabar fixtures contra los servicios reales")
+    parser.add_argument("--json", help="Guardar el reporte en este archivo")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    workdir = prepare_environment(args.record)
+    from benchmarks.replay import FixtureStore, ScriptedAnswers, install
+
+    store = FixtureStore(FIXTURES_FILE, record=args.record)
+    answers = ScriptedAnswers(options={
+        "generar una imagen": "Sí",
+        "modificar o mejorar el prompt": "No",
+        "usar esta imagen": "Usar la generada",
+    })
+    fake_openai = install(store, answers, latency=not args.no_latency,
+                          runware_latency_ms=0 if args.no_latency else args.runware_latency_ms)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenarios = build_scenarios(workdir, args.posts)
+    report = []
+    for name, fn in scenarios:
+        if args.only and name not in args.only:
+            continue
+        report.append(run_scenario(name, fn, args.iterations, args.memory, args.verbose,
+                                   reset=lambda: reset_caches(workdir)))
+
+    cols = ["scenario", "cold_ms", "p50_ms", "p90_ms", "p99_ms", "peak_mb", "cache_hit_rate"]
+    print(" ".join(f"{c:>20}" for c in cols))
+    for row in report:
+        print(" ".join(f"{str(row[c]):>20}" for c in cols))
+    print(f"\nLlamadas OpenAI falsas: {fake_openai.calls} | fixtures sin clave exacta: {store.misses}")
+
+    if args.record:
+        store.save()
+        print(f"✅ Fixtures grabadas en {FIXTURES_FILE}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,70 @@
+# benchmarks/bench_startup.py
+"""
+Presupuesto de tiempo de arranque del CLI: ejecuta `python -X importtime -c "import main"`
+en un proceso limpio, muestra los módulos más costosos y falla si se supera el presupuesto
+o si se importan dependencias pesadas antes del primer menú.
+Uso: python -m benchmarks.bench_startup [--budget-ms 150] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "openai", "runware", "requests", "httpx", "sentence_transformers")
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def clean_env():
+    env = dict(os.environ)
+    # sin claves: el arranque no debe depender de ellas
+    env.pop("OPENAI_API_KEY", None)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+def import_report(module="main"):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+        cwd=ROOT_DIR, env=clean_env(), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Falló la importación de {module}:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return rows, heavy
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=150)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows, heavy = import_report(args.module)
+    top_level = next((r for r in reversed(rows) if r[0] == args.module), None)
+    total_ms = top_level[2] / 1000 if top_level else 0.0
+
+    print(f"{'módulo':<50} {'propio ms':>10} {'acumulado ms':>13}")
+    for name, self_us, cum_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>10.1f} {cum_us / 1000:>13.1f}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (presupuesto {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if heavy:
+        print(f"❌ Dependencias pesadas importadas al arrancar: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("❌ Se superó el presupuesto de arranque")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Arranque dentro del presupuesto")
+
+if __name__ == "__main__":
+    main_cli()
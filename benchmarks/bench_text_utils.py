@@ -0,0 +1,58 @@
+# benchmarks/bench_text_utils.py
+"""
+Compara extract_common_words actual (tokenizador en streaming) contra la implementación anterior
+basada en re.sub + lista de tokens. Mide tiempo y pico de memoria (tracemalloc).
+Uso: python -m benchmarks.bench_text_utils [--posts 10000 100000]
+"""
+import argparse
+import random
+import re
+import time
+import tracemalloc
+from collections import Counter
+from utils.text_utils import extract_common_words
+
+WORDS = ("arquitectura microservicios python equipo datos cloud código agentes productividad "
+         "liderazgo scrum deuda técnica automatización de la el y en con para los las un una "
+         "the and for with team data").split()
+
+def legacy_extract_common_words(texts, top_n=20, stopwords=None):
+    tokens = []
+    for t in texts:
+        t = re.sub(r'[^\w\s]', ' ', t.lower())
+        tokens += t.split()
+    if not stopwords:
+        stopwords = set(["de","la","el","y","en","a","con","que","para","los","las","un","una","mi","me","se","es","al"])
+    filtered = [w for w in tokens if w not in stopwords and len(w)>2]
+    c = Counter(filtered)
+    return c.most_common(top_n)
+
+def make_corpus(n, words_per_post=120, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=words_per_post)) + "." for _ in range(n)]
+
+def measure(fn, texts):
+    # tiempo y memoria se miden por separado: tracemalloc distorsiona los tiempos
+    start = time.perf_counter()
+    fn(texts)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(texts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+def run(sizes):
+    print(f"{'posts':>8} {'legacy s':>10} {'legacy MB':>10} {'stream s':>10} {'stream MB':>10} {'bigram s':>10}")
+    for n in sizes:
+        texts = make_corpus(n)
+        t_old, m_old = measure(legacy_extract_common_words, texts)
+        t_new, m_new = measure(extract_common_words, texts)
+        t_bi, _ = measure(lambda ts: extract_common_words(ts, ngram=2), texts)
+        print(f"{n:>8} {t_old:>10.3f} {m_old:>10.1f} {t_new:>10.3f} {m_new:>10.1f} {t_bi:>10.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    run(args.posts)
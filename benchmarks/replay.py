@@ -0,0 +1,255 @@
+# benchmarks/replay.py
+"""
+Record/replay de dependencias externas para correr el pipeline sin red ni API keys.
+- HTTP (SerpApi, Bing, LinkedIn UGC/assets, descargas): se reemplaza services.http_client.request.
+- OpenAI chat/embeddings: se reemplaza services.openai_client.client por un cliente falso.
+- Runware: se reemplaza la clase Runware y la descarga async de imágenes.
+- ask_option/input: respuestas guionizadas.
+Las respuestas se buscan por clave exacta y, si no existen, por la fixture por defecto de su tipo.
+Los embeddings se generan de forma determinista a partir del hash del texto y Runware
+siempre es simulado; el modo record solo graba HTTP y chat.
+"""
+import builtins
+import hashlib
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EMBEDDING_DIM = 64
+SECRET_PARAMS = {"api_key", "key", "access_token"}
+
+def stable_hash(*parts):
+    return hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+
+class FixtureStore:
+    """Fixtures en JSON: {"http": {clave: resp}, "chat": {clave: resp}} con defaults por tipo."""
+
+    def __init__(self, path, record=False):
+        self.path = path
+        self.record = record
+        self.data = {"http": {}, "chat": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+        self.misses = 0
+
+    def get(self, kind, key, default_key):
+        entries = self.data.get(kind, {})
+        if key in entries:
+            return entries[key]
+        self.misses += 1
+        return entries.get(default_key)
+
+    def put(self, kind, key, value):
+        self.data.setdefault(kind, {})[key] = value
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+# ==========================
+# 🔹 HTTP
+# ==========================
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, body=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = body if isinstance(body, bytes) else body.encode("utf-8")
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size=65536):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def http_key(method, url, params=None):
+    params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    return f"{method.upper()} {url}?{urlencode(sorted(params.items()))}" if params else f"{method.upper()} {url}"
+
+def http_default_key(method, url):
+    """Fixture por defecto según el endpoint (host + ruta sin ids)."""
+    base = re.sub(r"https?://", "", url.split("?")[0])
+    if "serpapi.com" in base:
+        return "default:serpapi"
+    if "bing.com" in base:
+        return "default:bing"
+    if "registerUpload" in url:
+        return "default:linkedin_register_upload"
+    if "ugcPosts" in base:
+        return "default:linkedin_ugc_post"
+    if "linkedin" in base:
+        return "default:linkedin_upload"
+    return "default:binary"
+
+def make_replay_request(store, latency=True, real_request=None):
+    def request(method, url, timeout=None, retries=None, retry=None, **kwargs):
+        key = http_key(method, url, kwargs.get("params"))
+        if store.record and real_request:
+            resp = real_request(method, url, timeout=timeout, retries=retries, retry=retry, **kwargs)
+            body = resp.content
+            store.put("http", key, {
+                "status": resp.status_code,
+                "headers": {"Content-Type": resp.headers.get("Content-Type", "")},
+                "body": body.decode("utf-8", errors="replace"),
+            })
+            return resp
+        fixture = store.get("http", key, http_default_key(method, url)) or {"status": 404, "body": ""}
+        if latency and fixture.get("latency_ms"):
+            time.sleep(fixture["latency_ms"] / 1000)
+        return FakeResponse(fixture.get("status", 200), dict(fixture.get("headers", {})), fixture.get("body", ""))
+    return request
+
+# ==========================
+# 🔹 OpenAI
+# ==========================
+def chat_kind(kwargs):
+    fmt = kwargs.get("response_format") or {}
+    name = fmt.get("json_schema", {}).get("name") if isinstance(fmt, dict) else None
+    if name:
+        return name
+    user = kwargs.get("messages", [{}])[-1].get("content", "")
+    return "post_script" if '"prompt_for_image"' in user else "default"
+
+def fake_embedding(text):
+    seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32).tolist()
+
+class FakeOpenAI:
+    """Cliente mínimo con la forma de openai.OpenAI usada en services/openai_client."""
+
+    def __init__(self, store, latency=True, real_client=None):
+        self.store = store
+        self.latency = latency
+        self.real = real_client
+        self.calls = {"chat": 0, "embeddings": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    def _chat(self, **kwargs):
+        self.calls["chat"] += 1
+        key = stable_hash(kwargs.get("model"), kwargs.get("messages", [{}])[-1].get("content", ""))
+        if self.store.record and self.real:
+            real_kwargs = {k: v for k, v in kwargs.items() if k not in ("stream", "stream_options")}
+            resp = self.real.chat.completions.create(**real_kwargs)
+            content = resp.choices[0].message.content
+            self.store.put("chat", key, {"content": content})
+        else:
+            fixture = self.store.get("chat", key, f"default:{chat_kind(kwargs)}") or {"content": ""}
+            content = fixture["content"]
+            if self.latency and fixture.get("latency_ms"):
+                time.sleep(fixture["latency_ms"] / 1000)
+        usage = SimpleNamespace(prompt_tokens=len(kwargs.get("messages", [{}])[-1].get("content", "")) // 4,
+                                completion_tokens=len(content) // 4, total_tokens=0)
+        if kwargs.get("stream"):
+            return self._stream(content, usage)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _stream(self, content, usage):
+        for i in range(0, len(content), 16):
+            delta = SimpleNamespace(content=content[i:i + 16])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    def _embed(self, model, input):
+        self.calls["embeddings"] += 1
+        data = [SimpleNamespace(embedding=fake_embedding(t)) for t in input]
+        return SimpleNamespace(data=data, usage=SimpleNamespace(total_tokens=sum(len(t) // 4 for t in input)))
+
+# ==========================
+# 🔹 Runware
+# ==========================
+class FakeRunware:
+    latency_ms = 0
+
+    def __init__(self, api_key=None):
+        pass
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def imageInference(self, requestImage):
+        import asyncio
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        url = f"https://fixtures.local/{stable_hash(requestImage.positivePrompt)}.jpg"
+        return [SimpleNamespace(imageURL=url)]
+
+async def fake_download_image_async(image_url, save_path):
+    # bytes deterministas por URL: la misma imagen se deduplica en el image store
+    with open(save_path, "wb") as f:
+        f.write(b"\xff\xd8\xff" + image_url.encode("utf-8") * 64)
+    return save_path
+
+# ==========================
+# 🔹 Respuestas guionizadas
+# ==========================
+class ScriptedAnswers:
+    """Respuestas para ask_option (por fragmento del prompt) e input(); por defecto la primera opción."""
+
+    def __init__(self, options=None, inputs=None):
+        self.options = options or {}
+        self.inputs = inputs or {}
+
+    def ask_option(self, prompt, options, default=None):
+        for fragment, answer in self.options.items():
+            if fragment in prompt:
+                return answer
+        return options[0]
+
+    def input(self, prompt=""):
+        for fragment, answer in self.inputs.items():
+            if fragment in prompt:
+                return answer
+        return ""
+
+# ==========================
+# 🔹 Instalación
+# ==========================
+def install(store, answers, latency=True, runware_latency_ms=0):
+    """Reemplaza las dependencias externas en los módulos ya importados. Retorna el FakeOpenAI."""
+    import main
+    from agents import script_agent
+    from services import http_client, openai_client, linkedin_service, generate_image
+
+    real_request = http_client.request
+    http_client.request = make_replay_request(store, latency=latency, real_request=real_request)
+
+    fake = FakeOpenAI(store, latency=latency,
+                      real_client=openai_client.get_client() if store.record else None)
+    openai_client.client = fake
+
+    FakeRunware.latency_ms = runware_latency_ms
+    generate_image.Runware = FakeRunware
+    generate_image.download_image_async = fake_download_image_async
+
+    for module in (main, script_agent, linkedin_service):
+        module.ask_option = answers.ask_option
+    builtins.input = answers.input
+    return fake
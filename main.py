@@ -1,30 +1,76 @@
 # main.py
+import os
 import json
+import argparse
+import threading
 from datetime import datetime
-from agents.research_agent import research_topic
-from agents.performance_agent import analyze_performance
-from agents.script_agent import build_script_with_template, build_post_content
-from agents.hook_agent import pick_top_hooks
-from services.linkedin_service import create_post_with_generated_image
-from services.openai_client import get_trending_topic
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.pipeline import Stage, run_stages
+from utils.tracing import start_trace
 from utils.text_utils import ask_option
 
-def run_flow(user_topic, profile_path="data/profile_data.json"):
-    profile = json.load(open(profile_path, "r", encoding="utf-8"))
-    print("1) Research agent -> buscando y resumiendo...")
-    research = research_topic(user_topic, profile)
-    print("2) Performance agent -> analizando posts históricos...")
-    perf = analyze_performance()
-    print("3) Script agent -> generando guión...")
-    script = build_script_with_template(research, perf, profile)
-    print("4) Hook agent -> seleccionando hooks...")
-    hooks = pick_top_hooks(user_topic, n=3)
+# Los agentes y servicios (pandas, numpy, openai, runware...) se importan dentro de cada
+# función, solo cuando su etapa se ejecuta, para que el menú inicial aparezca de inmediato.
+
+def load_profile(profile_path="data/profile_data.json"):
+    with open(profile_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def run_flow(user_topic, profile_path="data/profile_data.json", profile=None, perf=None,
+             template=None, hooks_df=None, hook_index=None, stream=True, posts_dir="data/posts"):
+    """
+    Ejecuta el flujo completo para un tema.
+    Los parámetros opcionales permiten reutilizar datos ya cargados (modo batch);
+    si `template` es None la plantilla se elige de forma interactiva.
+    Con stream=True el guion se muestra mientras se genera.
+    Investigación, análisis de rendimiento y hooks corren en paralelo; el guion espera
+    a investigación y rendimiento.
+    """
+    from agents.research_agent import research_topic
+    from agents.performance_agent import analyze_performance
+    from agents.script_agent import build_script_with_template, load_templates, select_template
+    from agents.hook_agent import pick_top_hooks
+
+    if profile is None:
+        profile = load_profile(profile_path)
+    # Las etapas interactivas van antes de las esperas de red
+    if template is None:
+        template = select_template(load_templates())
+
+    def research_stage(_):
+        print("1) Research agent -> buscando y resumiendo...")
+        return research_topic(user_topic, profile)
+
+    def performance_stage(_):
+        print("2) Performance agent -> analizando posts históricos...")
+        return perf if perf is not None else analyze_performance(posts_dir)
+
+    def script_stage(inputs):
+        print("3) Script agent -> generando guión...")
+        return build_script_with_template(inputs["research"], inputs["performance"], profile,
+                                          template=template, stream=stream)
+
+    def hooks_stage(_):
+        print("4) Hook agent -> seleccionando hooks...")
+        return pick_top_hooks(user_topic, n=3, df=hooks_df, index=hook_index)
+
+    with start_trace("run_flow") as trace:
+        results, timings = run_stages([
+            Stage("research", research_stage),
+            Stage("performance", performance_stage),
+            Stage("hooks", hooks_stage),
+            Stage("script", script_stage, deps=["research", "performance"]),
+        ])
+    print("⏱️ Tiempos por etapa: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
     result = {
         "profile": profile,
-        "research": research,
-        "performance": perf,
-        "script": script,
-        "hooks": hooks
+        "template": template.get("id"),
+        "research": results["research"],
+        "performance": results["performance"],
+        "script": results["script"],
+        "hooks": results["hooks"],
+        "timings": timings,
+        "trace": trace.to_dict()
     }
     return result
 
@@ -57,6 +103,7 @@ def main():
     ]
     selected_topic = ""
     if tema_choice == "Automático":
+        from services.openai_client import get_trending_topic
         selected_topic = get_trending_topic()
     elif tema_choice == "Semi-Automatico":
         selected_topic = ask_option("Selecciona un tema:", temas)
@@ -73,12 +120,21 @@ def main():
     # Paso 2: Ejecutar flujo de generación
     out = run_flow(selected_topic)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    with open(f"output_run_{timestamp}.json", "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
-    print(f"✅ Resultado guardado en output_run_{timestamp}.json")
+    from utils.run_archive import get_run_archive
+    run_id = get_run_archive().save(out)
+    print(f"✅ Resultado guardado en el archivo de ejecuciones (#{run_id}). Ver con: python main.py --show-run {run_id}")
 
+    from agents.script_agent import build_post_content, script_failed
     script = out.get("script", {})
+    if script_failed(script):
+        print("❌ No se pudo generar un guion válido (ni tras la reparación); no hay nada que publicar.")
+        choice = ask_option("¿Qué quieres hacer ahora?", ["Generar nuevamente", "Salir"])
+        if choice == "Salir":
+            print("👋 Saliendo del programa...")
+            return
+        print("🔁 Reiniciando generación...")
+        return main()
+
     prompt_for_image = script.get("prompt_for_image", "")
     post_text = build_post_content(script)
 
@@ -109,7 +165,135 @@ def main():
 
     mode = "personal" if "personal" in main_choice.lower() else "organization"
 
-    create_post_with_generated_image(post_text, [prompt_for_image], mode=mode)
+    from services.linkedin_service import create_post_with_generated_image
+    create_post_with_generated_image(post_text, [prompt_for_image], mode=mode, ref=f"run:{run_id}")
+
+def run_topic(topic, template_key=None, profile_path="data/profile_data.json"):
+    """
+    Genera un borrador para un solo tema sin menús (--topic): lo archiva y lo imprime, sin publicar.
+    Sin `template_key` la plantilla se elige de forma interactiva.
+    """
+    from agents.script_agent import build_post_content, load_templates, find_template, script_failed
+    from utils.run_archive import get_run_archive
+
+    template = find_template(load_templates(), template_key) if template_key else None
+    print(f"\n🧠 Generando contenido para el tema: {topic}")
+    out = run_flow(topic, profile_path=profile_path, template=template)
+    run_id = get_run_archive().save(out)
+    script = out.get("script", {})
+    if script_failed(script):
+        print(f"❌ No se pudo generar un guion válido; respuesta cruda archivada (#{run_id}). "
+              f"Ver con: python main.py --show-run {run_id}")
+        return out
+    print("\n📄 Contenido generado:")
+    print(f"{build_post_content(script)}\n")
+    print("🖼️ Prompt para imagen:")
+    print(f"{script.get('prompt_for_image', '')}\n")
+    print(f"✅ Resultado guardado en el archivo de ejecuciones (#{run_id}). Ver con: python main.py --show-run {run_id}")
+    return out
+
+def run_batch(topics, template_key, out_path=None, workers=3, profile_path="data/profile_data.json"):
+    """
+    Modo batch (no interactivo): genera un borrador por tema con concurrencia acotada.
+    Perfil, plantillas, análisis de rendimiento e índice de hooks se cargan una sola vez.
+    Cada resultado se escribe en un JSONL en cuanto termina.
+    """
+    from agents.performance_agent import analyze_performance
+    from agents.script_agent import build_post_content, load_templates, find_template, script_failed
+    from agents.hook_agent import load_hooks, load_hook_index
+    from utils.run_archive import get_run_archive
+
+    profile = load_profile(profile_path)
+    template = find_template(load_templates(), template_key)
+    perf = analyze_performance()
+    hooks_df = load_hooks()
+    hook_index = load_hook_index(hooks_df)
+
+    if out_path is None:
+        out_path = f"batch_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    write_lock = threading.Lock()
+
+    archive = get_run_archive()
+
+    def generate(topic):
+        out = run_flow(topic, profile=profile, perf=perf, template=template,
+                       hooks_df=hooks_df, hook_index=hook_index, stream=False)
+        failed = script_failed(out.get("script"))
+        out["post_text"] = None if failed else build_post_content(out["script"])
+        out["run_id"] = archive.save(out)
+        if failed:
+            out["error"] = "No se pudo generar un guion válido"
+        return out
+
+    done = 0
+    with open(out_path, "a", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(generate, t): t for t in topics}
+        for fut in as_completed(futures):
+            topic = futures[fut]
+            try:
+                out = fut.result()
+                record = {"topic": topic, "ok": "error" not in out, **out}
+            except Exception as e:
+                record = {"topic": topic, "ok": False, "error": str(e)}
+                print(f"❌ Error generando '{topic}': {e}")
+            with write_lock:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+            done += 1
+            print(f"✅ [{done}/{len(topics)}] {topic}")
+
+    print(f"✅ Resultados guardados en {out_path}")
+    return out_path
+
+def read_topics(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generador de posts para LinkedIn")
+    parser.add_argument("--topic", help="Genera un borrador para este tema sin menús (no publica)")
+    parser.add_argument("--batch", help="Archivo de temas (uno por línea) para generar en modo no interactivo")
+    parser.add_argument("--template", help="Id o nombre de la plantilla (obligatorio en modo batch)")
+    parser.add_argument("--workers", type=int, default=3, help="Temas procesados en paralelo")
+    parser.add_argument("--out", help="Archivo JSONL de salida del modo batch")
+    parser.add_argument("--runs", nargs="?", const="", metavar="TEXTO",
+                        help="Lista ejecuciones archivadas (opcionalmente filtradas por tema)")
+    parser.add_argument("--hook", help="Filtra --runs por id de hook")
+    parser.add_argument("--limit", type=int, default=20, help="Máximo de ejecuciones a listar")
+    parser.add_argument("--show-run", type=int, metavar="ID", help="Muestra una ejecución archivada como JSON")
+    parser.add_argument("--import-runs", action="store_true",
+                        help="Importa los output_run_*.json existentes al archivo de ejecuciones")
+    return parser.parse_args()
+
+def runs_command(args):
+    from utils.run_archive import get_run_archive
+    archive = get_run_archive()
+    if args.import_runs:
+        print(f"✅ {archive.import_json_files()} ejecuciones importadas")
+    if args.show_run is not None:
+        run = archive.load(args.show_run)
+        if run is None:
+            raise SystemExit(f"No existe la ejecución #{args.show_run}")
+        print(json.dumps(run, ensure_ascii=False, indent=2))
+    if args.runs is not None:
+        for r in archive.list(limit=args.limit, topic=args.runs or None, template=args.template, hook_id=args.hook):
+            print(f"#{r['id']:<5} {r['created']}  [{r['template'] or '-'}]  {r['topic']}")
+        from agents.script_agent import get_parse_stats
+        stats = get_parse_stats()
+        if stats:
+            print("📊 Parseo de guiones: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.items())))
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.runs is not None or args.show_run is not None or args.import_runs:
+        runs_command(args)
+    elif args.batch:
+        if not args.template:
+            raise SystemExit("--template es obligatorio en modo batch")
+        if not os.path.exists(args.batch):
+            raise SystemExit(f"No existe el archivo de temas: {args.batch}")
+        run_batch(read_topics(args.batch), args.template, out_path=args.out, workers=args.workers)
+    elif args.topic:
+        run_topic(args.topic, template_key=args.template)
+    else:
+        main()
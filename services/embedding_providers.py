@@ -0,0 +1,158 @@
+# services/embedding_providers.py
+"""
+Proveedores de embeddings intercambiables:
+- openai: API de OpenAI (por defecto).
+- local: sentence-transformers en CPU; el modelo se carga una sola vez por proceso y en diferido.
+- hashing: vectores TF con hashing de palabras y bigramas; sin dependencias ni red.
+Se elige con EMBEDDING_PROVIDER; si falla el proveedor remoto se usa el local disponible y,
+si el modelo local no se puede cargar (p.ej. sin caché y sin red), hashing.
+"""
+import os
+import math
+import zlib
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from utils.text_utils import tokenize
+from utils.tracing import incr
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+HASHING_DIM = 512
+OPENAI_EMBEDDING_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+class EmbeddingProvider(ABC):
+    """
+    Interfaz: `model` identifica los vectores (clave de caché e índices); `embed` retorna (n, dim).
+    `dim` es la dimensión si se conoce sin llamar al modelo (None si no).
+    """
+    name = "base"
+    model = "base"
+    dim = None
+    batch_size = 256
+
+    @abstractmethod
+    def embed(self, texts):
+        ...
+
+    @property
+    def slug(self):
+        return f"{self.name}_{self.model}".replace("/", "_").replace(":", "_")
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+
+    def __init__(self, model="text-embedding-3-small"):
+        self.model = model
+        self.dim = OPENAI_EMBEDDING_DIMS.get(model)
+
+    def embed(self, texts):
+        from services import openai_client
+        response = openai_client.get_client().embeddings.create(model=self.model, input=list(texts))
+        if response.usage:
+            incr("tokens", response.usage.total_tokens)
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    name = "local"
+    batch_size = 64
+    _models = {}
+    _failed = set()
+    _lock = threading.Lock()
+
+    def __init__(self, model=LOCAL_EMBEDDING_MODEL):
+        self.model = model
+
+    def _load(self):
+        # una instancia por proceso y modelo, cargada solo cuando se usa
+        with self._lock:
+            if self.model in self._failed:
+                raise RuntimeError(f"El modelo local {self.model} no se pudo cargar en este proceso")
+            if self.model not in self._models:
+                from sentence_transformers import SentenceTransformer
+                print(f"🧠 Cargando modelo local de embeddings: {self.model}")
+                try:
+                    self._models[self.model] = SentenceTransformer(self.model, device="cpu")
+                except Exception:
+                    # no se reintenta en cada llamada: el proceso pasa a usar hashing
+                    self._failed.add(self.model)
+                    raise
+            return self._models[self.model]
+
+    @classmethod
+    def load_failed(cls, model=LOCAL_EMBEDDING_MODEL):
+        return model in cls._failed
+
+    def embed(self, texts):
+        model = self._load()
+        return model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+                            normalize_embeddings=True, show_progress_bar=False).astype(np.float32)
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """TF sublineal sobre palabras y bigramas proyectados con hashing (crc32) y signo."""
+    name = "hashing"
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.model = f"hash{dim}"
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feat in self._features(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                idx, sign = h % self.dim, 1.0 if (h >> 31) & 1 else -1.0
+                counts[(idx, sign)] = counts.get((idx, sign), 0) + 1
+            for (idx, sign), c in counts.items():
+                out[row, idx] += sign * (1.0 + math.log(c))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+def sentence_transformers_available():
+    try:
+        import sentence_transformers  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_local_provider():
+    """
+    Mejor proveedor sin red disponible: sentence-transformers o hashing si no está instalado
+    o su modelo ya falló al cargar en este proceso.
+    """
+    if sentence_transformers_available() and not SentenceTransformerProvider.load_failed():
+        return SentenceTransformerProvider()
+    return HashingEmbeddingProvider()
+
+def next_fallback_provider(provider):
+    """
+    Proveedor a usar cuando `provider` falla: el local y, si el que falló ya era local, hashing.
+    None si ya no queda alternativa (hashing no usa red ni modelos).
+    """
+    if provider.name == "hashing":
+        return None
+    local = get_local_provider()
+    if local.slug == provider.slug or provider.name == "local":
+        return HashingEmbeddingProvider()
+    return local
+
+def get_embedding_provider(name=None, model=None):
+    name = name or EMBEDDING_PROVIDER
+    if name == "openai":
+        return OpenAIEmbeddingProvider(model or "text-embedding-3-small")
+    if name == "local":
+        return SentenceTransformerProvider(model or LOCAL_EMBEDDING_MODEL) \
+            if sentence_transformers_available() else HashingEmbeddingProvider()
+    if name == "hashing":
+        return HashingEmbeddingProvider()
+    raise ValueError(f"Proveedor de embeddings desconocido: {name}")
@@ -1,59 +1,127 @@
 import os
-import requests
-import time 
+import asyncio
+import uuid
 from datetime import datetime
 from pathlib import Path
 from runware import Runware, IImageInference
+from services import http_client
+from services.image_store import get_image_store
 
-async def generate_images_with_runware(prompts, wait_seconds=2, output_dir="data/images"):
+IMAGE_MODEL = "runware:101@1"
+
+async def generate_images_with_runware(prompts, wait_seconds=2, output_dir="data/images",
+                                       concurrent=True, max_concurrency=4, use_cache=True, runware=None,
+                                       fresh=False, errors=None):
     """
-    Genera imágenes usando Runware por cada escena.
-    :param scenes: Lista de escenas (cada escena es un dict con clave 'Imagen')
-    :param video_type: Tipo de video ("long" = horizontal, otro = vertical)
-    :param wait_seconds: Tiempo de espera entre cada imagen
+    Genera imágenes usando Runware por cada prompt.
+    :param prompts: Lista de prompts (una imagen por prompt)
+    :param wait_seconds: Tiempo de espera entre cada imagen (solo en modo secuencial)
     :param output_dir: Carpeta donde guardar las imágenes
-    :return: Lista de rutas de archivos de imágenes generadas
+    :param concurrent: Si es True, envía los prompts a la vez (máx. `max_concurrency` en vuelo)
+    :param use_cache: Reutiliza imágenes ya generadas para el mismo prompt/modelo/tamaño
+    :param fresh: Genera de nuevo aunque haya imágenes en caché (la nueva se agrega al store)
+    :param runware: Conexión Runware ya abierta (se reutiliza y no se cierra al terminar)
+    :param errors: Lista opcional donde se agregan (prompt, excepción) de los prompts que fallan
+    :return: Una ruta por prompt, alineada con `prompts`; None en los prompts que fallan
+             (el resto se conserva).
     """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
-    image_files = []
     width, height = (1024, 1024)
 
-    RUN_API_KEY = os.getenv("RUNWARE_API_KEY")
-    print(f"🔑 Usando Runware API Key: {RUN_API_KEY} ")
-    runware = Runware(api_key=RUN_API_KEY) 
-    await runware.connect()
+    store = get_image_store() if use_cache else None
+    cached = {}
+    if store and not fresh:
+        for idx, prompt in enumerate(prompts):
+            paths = store.lookup(prompt, IMAGE_MODEL, width, height)
+            if paths:
+                cached[idx] = paths[0]
+        if len(cached) == len(prompts):
+            print("⚡ Usando imágenes ya generadas para estos prompts")
+            return [cached[i] for i in range(len(prompts))]
 
-    for idx, prompt in enumerate(prompts, start=1):
-        try:
+    owns_connection = runware is None
+    if owns_connection:
+        runware = await connect_runware()
+
+    semaphore = asyncio.Semaphore(max_concurrency if concurrent else 1)
+
+    async def generate_one(idx, prompt):
+        if idx in cached:
+            return cached[idx]
+        async with semaphore:
             request = IImageInference(
                 positivePrompt=prompt,
-                model="runware:101@1", 
+                model=IMAGE_MODEL,
                 width=width,
                 height=height,
             )
             result = await runware.imageInference(requestImage=request)
             if not result:
-                return []
+                raise RuntimeError("Runware no devolvió imágenes")
             image_url = result[0].imageURL  
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_path = os.path.join(output_dir, f"image_{timestamp}.jpg")            
-            download_image(image_url, file_path)
-            image_files.append(file_path)
+            file_path = os.path.join(output_dir, f"image_{timestamp}_{idx}_{uuid.uuid4().hex[:6]}.jpg")
+            await download_image_async(image_url, file_path)
+            if store:
+                file_path = store.add(prompt, IMAGE_MODEL, width, height, file_path)
+            if not concurrent and wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+            return file_path
 
-        except Exception as e:
-            return []
+    try:
+        results = await asyncio.gather(
+            *(generate_one(idx, p) for idx, p in enumerate(prompts)),
+            return_exceptions=True
+        )
+    finally:
+        if owns_connection:
+            await runware.disconnect()
 
-        if wait_seconds > 0:
-            time.sleep(wait_seconds)
-
-    await runware.disconnect()
+    image_files = []
+    for prompt, res in zip(prompts, results):
+        if isinstance(res, BaseException):
+            print(f"⚠️ No se pudo generar imagen para el prompt '{prompt[:60]}': {res}")
+            if errors is not None:
+                errors.append((prompt, res))
+            res = None
+        image_files.append(res)
     return image_files
 
+async def connect_runware():
+    """Abre una conexión (websocket) con Runware."""
+    RUN_API_KEY = os.getenv("RUNWARE_API_KEY")
+    runware = Runware(api_key=RUN_API_KEY) 
+    await runware.connect()
+    return runware
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+async def download_image_async(image_url, save_path):
+    """
+    Descarga una imagen en streaming sin bloquear el event loop, con reintentos y Retry-After
+    (http_client.adownload). Si falla no deja el archivo a medias.
+    """
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        # sin httpx: la descarga sync se ejecuta en un hilo
+        return await asyncio.to_thread(download_image, image_url, save_path)
+    return await http_client.adownload(image_url, save_path)
+
 def download_image(image_url, save_path):
-    """Descarga una imagen desde una URL y la guarda localmente."""
-    resp = requests.get(image_url)
-    resp.raise_for_status()
-    with open(save_path, "wb") as f:
-        f.write(resp.content)
+    """Descarga una imagen desde una URL y la guarda localmente. Si falla no deja el archivo a medias."""
+    try:
+        with http_client.get(image_url, stream=True) as resp:
+            resp.raise_for_status()
+            with open(save_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+    except BaseException:
+        _remove_partial(save_path)
+        raise
     return save_path
@@ -0,0 +1,169 @@
+# services/http_client.py
+"""
+Cliente HTTP compartido por todos los servicios.
+- Sync: una requests.Session con pool de conexiones por host (keep-alive, TLS una vez por host).
+- Async: un httpx.AsyncClient compartido por event loop (opcional, solo si httpx está instalado),
+  usado para descargas en streaming (`adownload`).
+- Timeouts por defecto y reintentos con backoff exponencial + jitter, respetando Retry-After.
+"""
+import os
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20
+POOL_SIZE = 20
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = {}  # event loop -> httpx.AsyncClient
+_async_lock = threading.Lock()
+
+def get_session():
+    """Session compartida con pool de conexiones por host."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def retry_after_seconds(headers):
+    """Interpreta Retry-After (segundos o fecha HTTP). Retorna None si no aplica."""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+def backoff_delay(attempt, headers=None):
+    """Backoff exponencial con jitter completo; Retry-After tiene prioridad."""
+    server_delay = retry_after_seconds(headers)
+    if server_delay is not None:
+        return min(server_delay, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def should_retry(method, retry):
+    return retry if retry is not None else method.upper() in IDEMPOTENT_METHODS
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES, retry=None, **kwargs):
+    """
+    Petición sync sobre la sesión compartida.
+    Los métodos no idempotentes (POST) no se reintentan salvo que se pase retry=True.
+    """
+    session = get_session()
+    attempts = retries + 1 if should_retry(method, retry) else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        if resp.status_code in RETRY_STATUS and not last:
+            delay = backoff_delay(attempt, resp.headers)
+            resp.close()
+            time.sleep(delay)
+            continue
+        return resp
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def get_async_client():
+    """
+    httpx.AsyncClient compartido (pool por host) del event loop actual. Requiere `httpx`.
+    Hay un cliente por loop (sus conexiones quedan ligadas al loop que lo creó); `run` o `aclose`
+    lo cierran antes de que el loop termine.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        # clientes de loops ya cerrados: sus sockets no se pueden cerrar desde otro loop
+        for dead in [l for l in _async_clients if l.is_closed()]:
+            print("⚠️ Cliente HTTP async sin cerrar de un event loop terminado; usa http_client.run()")
+            del _async_clients[dead]
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            import httpx
+            client = _async_clients[loop] = httpx.AsyncClient(
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0]),
+                limits=httpx.Limits(max_connections=POOL_SIZE * 5, max_keepalive_connections=POOL_SIZE),
+                follow_redirects=True,
+            )
+    return client
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+async def adownload(url, save_path, retries=MAX_RETRIES, chunk_size=64 * 1024, **kwargs):
+    """
+    GET en streaming a `save_path` sobre el cliente httpx compartido, con los mismos reintentos
+    que `request` (errores de red, RETRY_STATUS con backoff y Retry-After).
+    Un corte a mitad de la descarga la reintenta desde el inicio; si falla no deja el archivo a medias.
+    """
+    import httpx
+    client = get_async_client()
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        try:
+            async with client.stream("GET", url, **kwargs) as resp:
+                if resp.status_code in RETRY_STATUS and not last:
+                    delay = backoff_delay(attempt, resp.headers)
+                else:
+                    resp.raise_for_status()
+                    with open(save_path, "wb") as f:
+                        async for chunk in resp.aiter_bytes(chunk_size):
+                            f.write(chunk)
+                    return save_path
+        except httpx.TransportError:
+            _remove_partial(save_path)
+            if last:
+                raise
+            delay = backoff_delay(attempt)
+        except BaseException:
+            _remove_partial(save_path)
+            raise
+        await asyncio.sleep(delay)
+
+async def aclose():
+    """Cierra el cliente async del loop actual (si existe)."""
+    with _async_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def run(coro):
+    """asyncio.run que cierra el cliente async del loop antes de terminarlo (no deja conexiones abiertas)."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await aclose()
+    return asyncio.run(main())
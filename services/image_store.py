@@ -0,0 +1,133 @@
+# services/image_store.py
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+IMAGES_DIR = "data/images"
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", 512 * 1024 * 1024))
+
+def prompt_key(prompt, model, width, height):
+    return hashlib.sha256(f"{model}|{width}x{height}|{prompt.strip()}".encode("utf-8")).hexdigest()
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class ImageStore:
+    """
+    Almacén de imágenes direccionado por contenido:
+    - `blobs`: un archivo por hash de bytes (imágenes idénticas se guardan una vez).
+    - `renders`: índice prompt+modelo+tamaño -> hash de imagen.
+    - `pins`: imágenes referenciadas por ejecuciones archivadas o posts publicados (ref libre).
+    Evicción por presupuesto de tamaño (LRU por último uso); las imágenes con pin no se evictan.
+    """
+
+    def __init__(self, images_dir=IMAGES_DIR, max_bytes=IMAGE_STORE_MAX_BYTES):
+        self.images_dir = images_dir
+        self.max_bytes = max_bytes
+        os.makedirs(images_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(images_dir, ".index.sqlite"), check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, path TEXT, size INTEGER, last_used REAL);
+            CREATE TABLE IF NOT EXISTS renders (
+                key TEXT, prompt TEXT, model TEXT, width INTEGER, height INTEGER, sha TEXT, created REAL,
+                PRIMARY KEY (key, sha)
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs(last_used);
+            CREATE TABLE IF NOT EXISTS pins (sha TEXT, ref TEXT, created REAL, PRIMARY KEY (sha, ref));
+        """)
+        self._conn.commit()
+
+    def lookup(self, prompt, model, width, height):
+        """Rutas de imágenes ya generadas para este prompt (más recientes primero)."""
+        key = prompt_key(prompt, model, width, height)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT b.sha, b.path FROM renders r JOIN blobs b ON b.sha = r.sha "
+                "WHERE r.key = ? ORDER BY r.created DESC", (key,)
+            ).fetchall()
+            paths = []
+            now = time.time()
+            for sha, path in rows:
+                if os.path.exists(path):
+                    self._conn.execute("UPDATE blobs SET last_used = ? WHERE sha = ?", (now, sha))
+                    paths.append(path)
+                else:
+                    self._forget(sha)
+            self._conn.commit()
+        return paths
+
+    def add(self, prompt, model, width, height, tmp_path, ext=".jpg"):
+        """Registra una imagen descargada; si los bytes ya existen se reutiliza el archivo."""
+        sha = file_sha256(tmp_path)
+        final_path = os.path.join(self.images_dir, f"image_{sha[:20]}{ext}")
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM blobs WHERE sha = ?", (sha,)).fetchone()
+            if row and os.path.exists(row[0]):
+                os.remove(tmp_path)
+                final_path = row[0]
+            else:
+                shutil.move(tmp_path, final_path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)",
+                (sha, final_path, os.path.getsize(final_path), now)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (prompt_key(prompt, model, width, height), prompt, model, width, height, sha, now)
+            )
+            self._evict(keep=sha)
+            self._conn.commit()
+        return final_path
+
+    def pin(self, path, ref):
+        """Marca la imagen de `path` como referenciada por `ref`. Retorna False si no es del store."""
+        with self._lock:
+            row = self._conn.execute("SELECT sha FROM blobs WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                return False
+            self._conn.execute("INSERT OR IGNORE INTO pins VALUES (?, ?, ?)", (row[0], ref, time.time()))
+            self._conn.commit()
+        return True
+
+    def unpin(self, ref):
+        with self._lock:
+            self._conn.execute("DELETE FROM pins WHERE ref = ?", (ref,))
+            self._conn.commit()
+
+    def _forget(self, sha):
+        self._conn.execute("DELETE FROM renders WHERE sha = ?", (sha,))
+        self._conn.execute("DELETE FROM blobs WHERE sha = ?", (sha,))
+
+    def _evict(self, keep=None):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha, path, size in self._conn.execute(
+                "SELECT sha, path, size FROM blobs WHERE sha NOT IN (SELECT sha FROM pins) "
+                "ORDER BY last_used ASC").fetchall():
+            if sha == keep:
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+            self._forget(sha)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+_store = None
+
+def get_image_store():
+    global _store
+    if _store is None:
+        _store = ImageStore()
+    return _store
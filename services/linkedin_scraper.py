@@ -1,21 +1,155 @@
 # services/linkedin_scraper.py
+import csv
 import json
 import os
+import queue
+import threading
+
+SUPPORTED_EXTENSIONS = (".json", ".jsonl", ".csv")
+
+# Columnas del export oficial de LinkedIn (CSV) -> nombres internos
+CSV_COLUMN_ALIASES = {
+    "ShareCommentary": "text",
+    "Commentary": "text",
+    "Post commentary": "text",
+    "ShareLink": "url",
+    "Post URL": "url",
+    "Date": "date",
+    "Created date": "date",
+    "Reactions": "likes",
+    "Likes": "likes",
+    "Comments": "comments",
+    "Reposts": "shares",
+    "Shares": "shares",
+    "Impressions": "impressions",
+}
+
+def _iter_json(path):
+    """Un array JSON se lee elemento a elemento con ijson si está instalado; si no, de una vez."""
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith(b"["):
+            try:
+                import ijson
+            except ImportError:
+                ijson = None
+            if ijson is not None:
+                yield from ijson.items(f, "item", use_float=True)
+                return
+        data = json.load(f)
+    yield from (data if isinstance(data, list) else [data])
+
+def _iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def _iter_csv(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            yield {CSV_COLUMN_ALIASES.get(k, k): v for k, v in row.items() if k}
+
+READERS = {".json": _iter_json, ".jsonl": _iter_jsonl, ".csv": _iter_csv}
+
+def list_export_files(directory="data/posts"):
+    """Lista (ordenada) de archivos soportados en el directorio del export."""
+    if not os.path.exists(directory):
+        return []
+    with os.scandir(directory) as it:
+        files = [e.path for e in it if e.is_file() and e.name.lower().endswith(SUPPORTED_EXTENSIONS)]
+    return sorted(files)
+
+def iter_file_posts(path):
+    """Generador de los posts de un archivo del export (JSON, JSON Lines o CSV), en streaming."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        yield from READERS[ext](path)
+    except Exception as e:
+        print("Error leyendo", os.path.basename(path), e)
+
+def read_export_file(path):
+    """Lee un archivo del export completo y devuelve su lista de posts."""
+    return list(iter_file_posts(path))
+
+def iter_exported_posts(directory="data/posts", chunk_size=5000, max_workers=8, files=None, with_source=False):
+    """
+    Generador: lee los archivos del export en paralelo y entrega los posts en bloques de hasta `chunk_size`.
+    - Como mucho `max_workers` archivos abiertos a la vez, cada uno leído en streaming.
+    - La cola hacia el consumidor está acotada: si el consumidor va lento, los lectores esperan,
+      así que en memoria hay a lo sumo unos pocos bloques por lector.
+    - with_source=True entrega (rutas, posts), con la ruta del archivo de cada post.
+    """
+    files = list_export_files(directory) if files is None else list(files)
+    if not files:
+        return
+    workers = max(1, min(max_workers, len(files)))
+    out = queue.Queue(maxsize=workers * 2)
+    pending = iter(files)
+    pending_lock = threading.Lock()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            while not stop.is_set():
+                with pending_lock:
+                    path = next(pending, None)
+                if path is None:
+                    return
+                block = []
+                for post in iter_file_posts(path):
+                    block.append(post)
+                    if len(block) >= chunk_size:
+                        if not put((path, block)):
+                            return
+                        block = []
+                if block and not put((path, block)):
+                    return
+        finally:
+            put(None)
+
+    threads = [threading.Thread(target=reader, name=f"export-reader-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    paths, chunk, running = [], [], workers
+    try:
+        while running:
+            item = out.get()
+            if item is None:
+                running -= 1
+                continue
+            path, block = item
+            # se reagrupan bloques de varios archivos pequeños hasta chunk_size
+            for post in block:
+                chunk.append(post)
+                paths.append(path)
+                if len(chunk) >= chunk_size:
+                    yield (paths, chunk) if with_source else chunk
+                    paths, chunk = [], []
+        if chunk:
+            yield (paths, chunk) if with_source else chunk
+    finally:
+        stop.set()
 
 def load_exported_posts(directory="data/posts"):
     """
-    Lee JSONs en data/posts y devuelve lista de posts.
+    Lee el export en data/posts y devuelve lista de posts.
     """
     posts = []
-    if not os.path.exists(directory):
-        return posts
-    for fname in os.listdir(directory):
-        if fname.endswith(".json"):
-            with open(os.path.join(directory, fname), "r", encoding="utf-8") as f:
-                try:
-                    posts.append(json.load(f))
-                except Exception as e:
-                    print("Error leyendo", fname, e)
+    for chunk in iter_exported_posts(directory):
+        posts.extend(chunk)
     return posts
 
 # Opcional: función placeholder para scraping con Playwright (no implementada por defecto)
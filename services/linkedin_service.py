@@ -1,9 +1,9 @@
 import os
-import requests
+import time
+from services import http_client
 from dotenv import load_dotenv
-from services.generate_image import generate_images_with_runware
-import asyncio
 from utils.text_utils import ask_option
+from utils.tracing import traced, annotate
 
 # -------------------------------
 # Cargar variables de entorno
@@ -26,6 +26,7 @@ HEADERS = {
 # -------------------------------
 # 1️⃣ Subir imagen a LinkedIn
 # -------------------------------
+@traced("upload_image_to_linkedin")
 def upload_image_to_linkedin(image_path, author=LINKEDIN_PERSON_URN):
     """Registra y sube una imagen a LinkedIn"""
     register_url = f"{BASE_URL}/assets?action=registerUpload"
@@ -43,7 +44,7 @@ def upload_image_to_linkedin(image_path, author=LINKEDIN_PERSON_URN):
     }
 
     # Paso 1: Registrar subida
-    resp = requests.post(register_url, headers=HEADERS, json=register_body)
+    resp = http_client.post(register_url, headers=HEADERS, json=register_body, retry=True)
     resp.raise_for_status()
     data = resp.json()
 
@@ -51,11 +52,12 @@ def upload_image_to_linkedin(image_path, author=LINKEDIN_PERSON_URN):
     asset_urn = data["value"]["asset"]
 
     # Paso 2: Subir binario
+    annotate(bytes=os.path.getsize(image_path))
     with open(image_path, "rb") as f:
         upload_headers = {
             "Authorization": f"Bearer {LINKEDIN_ACCESS_TOKEN}"
         }
-        upload_resp = requests.post(upload_url, data=f, headers=upload_headers)
+        upload_resp = http_client.post(upload_url, data=f, headers=upload_headers, timeout=(5, 120))
         upload_resp.raise_for_status()
 
     print(f"✅ Imagen subida correctamente: {asset_urn}")
@@ -64,6 +66,7 @@ def upload_image_to_linkedin(image_path, author=LINKEDIN_PERSON_URN):
 # -------------------------------
 # 2️⃣ Publicar un post (texto o imagen)
 # -------------------------------
+@traced("publish_linkedin_post")
 def publish_linkedin_post(text, image_urn=None, author=LINKEDIN_PERSON_URN):
     """Publica un post en LinkedIn con o sin imagen"""
 
@@ -94,7 +97,7 @@ def publish_linkedin_post(text, image_urn=None, author=LINKEDIN_PERSON_URN):
             }
         ]
 
-    resp = requests.post(f"{BASE_URL}/ugcPosts", headers=HEADERS, json=payload)
+    resp = http_client.post(f"{BASE_URL}/ugcPosts", headers=HEADERS, json=payload)
     resp.raise_for_status()
 
     print("✅ Post publicado correctamente")
@@ -104,8 +107,11 @@ def publish_linkedin_post(text, image_urn=None, author=LINKEDIN_PERSON_URN):
 # -------------------------------
 # 3️⃣ Crear post con imagen generada por IA
 # -------------------------------
-def create_post_with_generated_image(prompt, prompts_for_images, mode="personal"):
-    """Genera una imagen con IA, permite revisarla o reemplazarla, y publica un post"""
+def create_post_with_generated_image(prompt, prompts_for_images, mode="personal", ref=None):
+    """
+    Genera una imagen con IA, permite revisarla, regenerarla o reemplazarla, y publica un post.
+    `ref` (p.ej. "run:<id>") queda asociado a la imagen publicada para que el store no la evicte.
+    """
 
     print("\n🎨 Generación de imagen:")
 
@@ -132,18 +138,27 @@ def create_post_with_generated_image(prompt, prompts_for_images, mode="personal"
                 print("\n✨ Prompt actualizado correctamente.")
 
         print(f"\n🧩 Generando imagen con el prompt:\n➡️ {prompt_final}\n")
-        image_files = asyncio.run(generate_images_with_runware([prompt_final]))
+        # runware se importa solo si se genera una imagen
+        from services.generate_image import generate_images_with_runware
+        image_files = [f for f in http_client.run(generate_images_with_runware([prompt_final])) if f]
 
-        if image_files and len(image_files) > 0:
+        while image_files and len(image_files) > 0:
             print(f"\n✅ Imagen generada: {image_files[0]}")
             print("📸 Por favor revisa la imagen generada antes de continuar.")
             input("⏸️ Presiona Enter cuando la hayas revisado...")
 
             decision = ask_option(
                 "¿Deseas usar esta imagen o reemplazarla por una existente?",
-                ["Usar la generada", "Reemplazar por una existente"]
+                ["Usar la generada", "Generar nuevamente", "Reemplazar por una existente"]
             )
 
+            if decision == "Generar nuevamente":
+                # fresh=True: no reutilizar la imagen en caché para el mismo prompt
+                print("🔁 Generando una imagen nueva...")
+                fresh_files = [f for f in http_client.run(generate_images_with_runware([prompt_final], fresh=True)) if f]
+                image_files = fresh_files or image_files
+                continue
+
             if decision == "Reemplazar por una existente":
                 ruta_manual = input("\n📂 Escribe la ruta completa de la imagen que quieres usar: ").strip()
                 if os.path.exists(ruta_manual):
@@ -151,21 +166,36 @@ def create_post_with_generated_image(prompt, prompts_for_images, mode="personal"
                     print("✅ Imagen reemplazada correctamente.")
                 else:
                     print("⚠️ La ruta especificada no existe. Se usará la imagen generada por IA.")
+            break
 
     else:
         print("🚫 No se generará imagen para este post.")
         image_files = None
 
     # Paso final: publicación
+    return publish_post(prompt, image_files[0] if image_files else None, mode=mode, ref=ref)
+
+# -------------------------------
+# 4️⃣ Publicar sin interacción
+# -------------------------------
+def publish_post(text, image_path=None, mode="personal", ref=None):
+    """
+    Sube la imagen (si hay) y publica el post en el perfil personal o de empresa.
+    La imagen publicada queda con pin en el image store (no se evicta).
+    """
     image_urn = None
     AUTHOR_URN = LINKEDIN_PERSON_URN if mode == "personal" else LINKEDIN_ORGANIZATION_URN
 
-    if image_files:
-        image_urn = upload_image_to_linkedin(image_files[0], author=AUTHOR_URN)
+    if image_path:
+        image_urn = upload_image_to_linkedin(image_path, author=AUTHOR_URN)
 
         if not image_urn:
             print("⚠️ No se pudo subir la imagen a LinkedIn.")
             raise ValueError("No se pudo subir la imagen a LinkedIn.")
 
-    return publish_linkedin_post(prompt, image_urn=image_urn, author=AUTHOR_URN)
+    result = publish_linkedin_post(text, image_urn=image_urn, author=AUTHOR_URN)
+    if image_path:
+        from services.image_store import get_image_store
+        get_image_store().pin(image_path, ref or f"published:{result.get('id', time.time())}")
+    return result
 
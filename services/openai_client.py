@@ -1,44 +1,144 @@
+import time
+import threading
 import numpy as np
 from datetime import datetime
-from openai import OpenAI
+from utils.embedding_cache import get_embedding_cache, embedding_key
+from services.embedding_providers import get_embedding_provider, next_fallback_provider
+from utils.tracing import traced, annotate, record
 
-client = OpenAI()
+client = None
+_client_lock = threading.Lock()
 
-def generate_text(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 512, temperature: float = 0.7) -> str:
+def get_client():
+    """Cliente de OpenAI creado en diferido: importar este módulo no requiere API key."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI()
+    return client
+
+SYSTEM_PROMPT = "Eres un asistente experto en creación de contenido viral para LinkedIn."
+
+def json_schema_format(name: str, schema: dict) -> dict:
+    """response_format para salida estructurada validada contra un JSON schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+
+@traced("generate_text")
+def generate_text(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 512, temperature: float = 0.7,
+                  response_format: dict = None) -> str:
     """
     Genera texto usando OpenAI Chat API con el nuevo cliente.
+    `response_format` permite pedir salida estructurada (ver json_schema_format).
     """
     try:
-        response = client.chat.completions.create(
+        extra = {"response_format": response_format} if response_format else {}
+        response = get_client().chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": "Eres un asistente experto en creación de contenido viral para LinkedIn."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            **extra
         )
+        if response.usage:
+            annotate(model=model, prompt_tokens=response.usage.prompt_tokens,
+                     completion_tokens=response.usage.completion_tokens)
         return response.choices[0].message.content.strip()
     except Exception as e:
         return f"[ERROR] No se pudo generar texto con OpenAI: {e}"
 
-def embed_texts(texts, model: str = "text-embedding-3-small"):
+def generate_text_stream(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 512, temperature: float = 0.7,
+                         response_format: dict = None):
     """
-    Genera embeddings usando OpenAI Embeddings API.
-    Retorna un array de NumPy.
+    Igual que generate_text pero en streaming: genera los fragmentos de texto a medida que llegan.
     """
+    start, t0 = time.time(), time.perf_counter()
+    usage = {}
     try:
-        response = client.embeddings.create(
+        extra = {"response_format": response_format} if response_format else {}
+        stream = get_client().chat.completions.create(
             model=model,
-            input=texts
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **extra
         )
-        embeddings = [item.embedding for item in response.data]
-        return np.array(embeddings)
+        for chunk in stream:
+            if chunk.usage:
+                usage = {"prompt_tokens": chunk.usage.prompt_tokens,
+                         "completion_tokens": chunk.usage.completion_tokens}
+            if chunk.choices and chunk.choices[0].delta.content:
+                if "first_token_ms" not in usage:
+                    usage["first_token_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                yield chunk.choices[0].delta.content
     except Exception as e:
-        print(f"[ERROR] No se pudo generar embeddings con OpenAI: {e}")
-        # fallback: embeddings aleatorios
-        rng = np.random.default_rng(0)
-        return rng.standard_normal((len(texts), 384))
+        yield f"[ERROR] No se pudo generar texto con OpenAI: {e}"
+    finally:
+        record("generate_text_stream", start, time.perf_counter() - t0, model=model, **usage)
+
+def embed_chunk(provider, texts, retries=1):
+    """Embebe un lote; si falla se reintenta solo ese lote antes de propagar el error."""
+    for attempt in range(retries + 1):
+        try:
+            return provider.embed(texts)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * (attempt + 1))
+
+@traced("embed_texts")
+def embed_texts(texts, model: str = None, batch_size: int = None, use_cache: bool = True,
+                provider=None, fallback: bool = True):
+    """
+    Genera embeddings con el proveedor configurado (OpenAI por defecto, ver services/embedding_providers).
+    Usa una caché por modelo + hash del texto: solo los textos no vistos se envían al proveedor,
+    en lotes de `batch_size`, y se devuelven en el mismo orden de entrada.
+    Si el proveedor falla y fallback=True, se usa el proveedor local (y luego hashing) en lugar de vectores aleatorios.
+    Retorna un array de NumPy.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    provider = provider or get_embedding_provider(model=model)
+    batch_size = batch_size or provider.batch_size
+    cache = get_embedding_cache() if use_cache else None
+    keys = [embedding_key(provider.slug, t) for t in texts]
+    found = cache.get_many(keys) if cache else {}
+
+    # textos únicos que faltan, conservando el orden de aparición
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    annotate(provider=provider.slug, texts=len(texts), cache_hits=sum(k in found for k in keys),
+             api_texts=len(missing))
+    if missing:
+        text_of = dict(zip(keys, texts))
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            try:
+                vectors = embed_chunk(provider, [text_of[k] for k in chunk])
+            except Exception as e:
+                local = next_fallback_provider(provider)
+                if not fallback or local is None:
+                    raise
+                # los lotes ya embebidos quedan en caché; el resto no puede mezclarse con otro
+                # espacio vectorial, así que toda la llamada se resuelve con el proveedor local
+                print(f"[ERROR] No se pudo generar embeddings con {provider.name}: {e}. Usando {local.name}.")
+                return embed_texts(texts, use_cache=use_cache, provider=local, fallback=True)
+            fresh = list(zip(chunk, vectors))
+            found.update(fresh)
+            if cache:
+                cache.put_many(provider.slug, fresh)
+
+    return np.vstack([found[k] for k in keys])
 
 def get_trending_topic():
     """
@@ -48,7 +148,7 @@ def get_trending_topic():
     prompt = f"""
     Eres un analista de tendencias experto en tecnología, negocios, liderazgo, innovación y emprendimiento. Investiga en internet cuáles son los temas más virales y relevantes actualmente en LinkedIn. No te limites a IA o software: incluye también tendencias en negocios globales, sostenibilidad, macroeconomía, cultura laboral, management, startups y transformación digital. Con base en lo que esté resonando hoy en redes profesionales, identifica los temas con mayor tracción. Sugiere tres posibles ideas de contenido, pero al final SOLO devuelve el título del tema más viral. Solo el título.
     """
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": ""},
@@ -1,64 +1,286 @@
 import os
-import requests
+import re
+import html
+import time
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services import http_client
+from utils.cache import load_cache, load_cache_entry, save_cache
+from utils.summarizer import summarize, DEFAULT_TOKEN_BUDGET
+from utils.tracing import traced, annotate, bind_context
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
-def web_search(query, num=10):
+SEARCH_CACHE_VERSION = "v2"
+# segundos que un resultado se considera fresco, por proveedor
+SEARCH_FRESHNESS = {"serpapi": 60*60*6, "bing": 60*60*2}
+# pasado este tiempo un resultado viejo ya no se sirve (ni siquiera mientras se revalida)
+SEARCH_MAX_STALE = 60*60*24*3
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def search_serpapi(query, num=10, retries=0):
+    url = "https://serpapi.com/search.json"
+    params = {"q": query, "api_key": SERPAPI_KEY, "num": num}
+    resp = http_client.get(url, params=params, timeout=(5, 10), retries=retries)
+    r = resp.json()
+    results = []
+    for o in r.get("organic_results", []):
+        results.append({
+            "title": o.get("title"),
+            "link": o.get("link"),
+            "snippet": o.get("snippet","")
+        })
+    annotate(provider="serpapi", bytes=len(resp.content), results=len(results))
+    return results
+
+# Cada resultado es un <li class="b_algo">; título y snippet se buscan solo dentro de su bloque,
+# así el texto fuera de los resultados (pie de página, respuestas) no se asigna al último.
+BING_ITEM_RE = re.compile(r'<li class="b_algo"')
+BING_LI_RE = re.compile(r'<li\b|</li\s*>')
+BING_TITLE_RE = re.compile(r'<h2[^>]*>\s*<a[^>]*?href="(?P<link>[^"]+)"[^>]*>(?P<title>.*?)</a>\s*</h2>', flags=re.S)
+BING_SNIPPET_RE = re.compile(r'<p[^>]*>(?P<snippet>.*?)</p>', flags=re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+def _clean_html(fragment):
+    return html.unescape(TAG_RE.sub('', fragment)).strip()
+
+def iter_bing_blocks(text):
+    """Fragmentos de cada <li class="b_algo">: hasta su </li> (con <li> anidados) o el siguiente resultado."""
+    m = BING_ITEM_RE.search(text)
+    while m:
+        following = BING_ITEM_RE.search(text, m.end())
+        end = following.start() if following else len(text)
+        depth = 0
+        for tag in BING_LI_RE.finditer(text, m.start(), end):
+            depth += -1 if tag.group().startswith("</") else 1
+            if depth == 0:
+                end = tag.end()
+                break
+        yield text[m.start():end]
+        m = following
+
+def parse_bing_results(text, num=10):
+    """Extrae {'title','link','snippet'} de la página de resultados de Bing, un bloque b_algo a la vez."""
+    results = []
+    for block in iter_bing_blocks(text):
+        title = BING_TITLE_RE.search(block)
+        if not title:
+            continue
+        snippet = BING_SNIPPET_RE.search(block, title.end())
+        results.append({
+            "title": _clean_html(title.group("title")),
+            "link": html.unescape(title.group("link")),
+            "snippet": _clean_html(snippet.group("snippet")) if snippet else "",
+        })
+        if len(results) >= num:
+            break
+    return results
+
+def search_bing(query, num=10, retries=0):
+    ua = {"User-Agent": "Mozilla/5.0"}
+    resp = http_client.get("https://www.bing.com/search", params={"q": query}, headers=ua, timeout=(5, 8), retries=retries)
+    snippets = parse_bing_results(resp.text, num)
+    annotate(provider="bing", bytes=len(resp.content), results=len(snippets))
+    return snippets
+
+PROVIDERS = {"serpapi": search_serpapi, "bing": search_bing}
+
+def search_providers():
+    """Proveedores en orden de preferencia: SerpApi (si hay key) y Bing como respaldo."""
+    return (["serpapi"] if SERPAPI_KEY else []) + ["bing"]
+
+def normalize_query(query):
     """
-    Busca usando SerpApi si está configurado. Retorna lista de {'title','link','snippet'}.
-    Si no hay SerpApi, intenta una búsqueda simple por requests (fallback).
+    Normaliza la query para la caché: minúsculas, sin acentos y con los espacios colapsados.
+    Se conservan el orden, las palabras repetidas y los signos, porque cambian los resultados.
     """
-    results = []
-    if SERPAPI_KEY:
-        url = "https://serpapi.com/search.json"
-        params = {"q": query, "api_key": SERPAPI_KEY, "num": num}
+    text = unicodedata.normalize("NFKD", query.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+def search_cache_key(query, provider, num):
+    return f"search_{SEARCH_CACHE_VERSION}|{provider}|{num}|{normalize_query(query)}"
+
+def _fetch_and_store(provider, query, num, retries=0, store=True):
+    # solo las respuestas entran al histograma: un timeout o error no es latencia del proveedor
+    start = time.perf_counter()
+    results = PROVIDERS[provider](query, num, retries=retries)
+    record_latency(provider, time.perf_counter() - start)
+    if results and store:
+        save_cache(search_cache_key(query, provider, num), results, ttl_seconds=SEARCH_MAX_STALE)
+    return results
+
+def _refresh_in_background(provider, query, num):
+    key = search_cache_key(query, provider, num)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
         try:
-            r = requests.get(url, params=params, timeout=10).json()
-            organic = r.get("organic_results", [])
-            for o in organic:
-                results.append({
-                    "title": o.get("title"),
-                    "link": o.get("link"),
-                    "snippet": o.get("snippet","")
-                })
-            return results
+            _fetch_and_store(provider, query, num)
         except Exception as e:
-            print("SerpApi error:", e)
-            
-    try:
-        ua = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(f"https://www.bing.com/search?q={requests.utils.quote(query)}", headers=ua, timeout=8)
-        text = resp.text
-        # heurística simple para extraer fragmentos (no robusto)
-        snippets = []
-        import re
-        for m in re.finditer(r'<li class="b_algo".*?>(.*?)</li>', text, flags=re.S) :
-            block = m.group(1)
-            title_m = re.search(r'<h2><a href="([^"]+)"[^>]*>(.*?)</a></h2>', block, flags=re.S)
-            snippet_m = re.search(r'<p>(.*?)</p>', block, flags=re.S)
-            if title_m:
-                link = title_m.group(1)
-                title = re.sub('<.*?>', '', title_m.group(2)).strip()
-                snippet = re.sub('<.*?>', '', snippet_m.group(1)).strip() if snippet_m else ""
-                snippets.append({"title": title, "link": link, "snippet": snippet})
-                if len(snippets) >= num:
-                    break
-        return snippets
-    except Exception as e:
-        print("Fallback web_search error:", e)
+            print(f"Error revalidando búsqueda ({provider}):", e)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"search-refresh-{provider}", daemon=True).start()
+
+def cached_results(provider, query, num=10):
+    """
+    Resultado en caché por query normalizada + proveedor + num, o None.
+    - Fresco: se devuelve tal cual.
+    - Viejo (hasta SEARCH_MAX_STALE): se devuelve de inmediato y se revalida en segundo plano.
+    """
+    entry = load_cache_entry(search_cache_key(query, provider, num), ttl_seconds=SEARCH_MAX_STALE)
+    if not entry:
+        return None
+    ts, results = entry
+    age = time.time() - ts
+    annotate(provider=provider, cache_age_s=round(age, 1))
+    if age > SEARCH_FRESHNESS.get(provider, 60*60):
+        annotate(stale=True)
+        _refresh_in_background(provider, query, num)
     return results
 
-def summarize_texts(texts, max_sentences=5):
+# ==========================
+# 🔹 Hedging entre proveedores
+# ==========================
+# límites (ms) de los buckets del histograma de latencia por proveedor
+LATENCY_BUCKETS_MS = [100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000, 12000]
+HEDGE_DEFAULT_DELAY = 2.0
+HEDGE_MIN_DELAY = 0.3
+HEDGE_MAX_DELAY = 8.0
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 20
+LATENCY_CACHE_KEY = "search_latency_histograms"
+
+_histograms = None
+_histograms_lock = threading.Lock()
+
+def _load_histograms():
+    global _histograms
+    if _histograms is None:
+        _histograms = load_cache(LATENCY_CACHE_KEY) or {}
+    return _histograms
+
+def record_latency(provider, seconds):
+    """Suma una muestra al histograma del proveedor (con decaimiento para adaptarse a cambios)."""
+    ms = seconds * 1000
+    bucket = next((i for i, edge in enumerate(LATENCY_BUCKETS_MS) if ms <= edge), len(LATENCY_BUCKETS_MS))
+    with _histograms_lock:
+        hist = _load_histograms().setdefault(provider, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+        hist[bucket] += 1
+        total = sum(hist)
+        if total > 1000:
+            hist[:] = [c // 2 for c in hist]
+        snapshot = {k: list(v) for k, v in _histograms.items()}
+        persist = total % 10 == 0
+    if persist:
+        save_cache(LATENCY_CACHE_KEY, snapshot)
+
+def latency_percentile(provider, q=HEDGE_PERCENTILE):
+    """Percentil (segundos, límite superior del bucket) o None si hay pocas muestras."""
+    with _histograms_lock:
+        hist = list(_load_histograms().get(provider, []))
+    total = sum(hist)
+    if total < HEDGE_MIN_SAMPLES:
+        return None
+    acc = 0
+    for i, count in enumerate(hist):
+        acc += count
+        if acc >= q * total:
+            return (LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else LATENCY_BUCKETS_MS[-1] * 2) / 1000
+    return None
+
+def hedge_delay(provider):
+    p = latency_percentile(provider)
+    if p is None:
+        return HEDGE_DEFAULT_DELAY
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p))
+
+def hedged_fetch(query, num, providers, use_cache=True):
+    """
+    Lanza el proveedor principal; si no responde dentro de su p90 (o falla), lanza el siguiente
+    y gana la primera respuesta no vacía. Las peticiones perdedoras terminan en segundo plano
+    y, con use_cache, su resultado igual queda en caché.
+    Cada llamada usa su propio pool con un hilo por proveedor: ninguna petición espera en cola,
+    así el plazo del hedge y el histograma miden solo la latencia del proveedor.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="search-hedge")
+    try:
+        return _hedged_wait(pool, query, num, providers, use_cache)
+    finally:
+        # las peticiones perdedoras siguen en sus hilos; el pool se libera al terminar
+        pool.shutdown(wait=False)
+
+def _hedged_wait(pool, query, num, providers, use_cache):
+    backups = list(providers[1:])
+    futures = {pool.submit(bind_context(_fetch_and_store), providers[0], query, num,
+                           store=use_cache): providers[0]}
+
+    def launch_backup():
+        provider = backups.pop(0)
+        futures[pool.submit(bind_context(_fetch_and_store), provider, query, num,
+                            store=use_cache)] = provider
+        return provider
+
+    while futures:
+        timeout = hedge_delay(providers[0]) if backups else None
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            annotate(hedged=launch_backup(), hedge_delay_s=timeout)
+            continue
+        for fut in done:
+            provider = futures.pop(fut)
+            try:
+                results = fut.result()
+            except Exception as e:
+                print(f"{provider} web_search error:", e)
+                results = []
+            if results:
+                annotate(winner=provider)
+                return results
+            if backups:
+                launch_backup()
+    return []
+
+@traced("web_search")
+def web_search(query, num=10, use_cache=True, hedge=True):
+    """
+    Busca usando SerpApi si está configurado. Retorna lista de {'title','link','snippet'}.
+    Con hedge=True, si SerpApi tarda más que su p90 se lanza también Bing y gana la primera respuesta;
+    sin hedge, Bing solo se intenta si SerpApi falla.
+    """
+    providers = search_providers()
+    if use_cache:
+        for provider in providers:
+            results = cached_results(provider, query, num)
+            if results:
+                return results
+    if hedge and len(providers) > 1:
+        return hedged_fetch(query, num, providers, use_cache=use_cache)
+    for provider in providers:
+        try:
+            # sin hedge no hay otra petición en vuelo: se permite un reintento
+            results = _fetch_and_store(provider, query, num, retries=1, store=use_cache)
+            if results:
+                return results
+        except Exception as e:
+            print(f"{provider} web_search error:", e)
+    return []
+
+def summarize_texts(texts, max_sentences=5, max_tokens=DEFAULT_TOKEN_BUDGET):
     """
-    Resumen heurístico: juntar textos y devolver primeras oraciones más relevantes.
-    Puedes mejorar usando un LLM.
+    Resumen extractivo: oraciones rankeadas con TextRank sobre TF-IDF, sin casi duplicados
+    (SimHash) y ajustadas a max_tokens. Ver utils/summarizer.py.
     """
-    import re
-    big = " ".join([t for t in texts if t])
-    # Limitar por tamaño
-    big = big[:12000]
-    sentences = re.split(r'(?<=[.!?])\s+', big)
-    return " ".join(sentences[:max_sentences])
+    return summarize([t for t in texts if t], max_sentences=max_sentences, max_tokens=max_tokens)
@@ -0,0 +1,167 @@
+# services/source_fetcher.py
+"""
+Descarga el texto completo de las fuentes de la investigación.
+- Concurrente con límite de conexiones por host y un deadline total (no crece con el número de fuentes).
+- Cuerpos en streaming con tope de bytes; el texto principal se extrae con BeautifulSoup.
+- Caché por URL con ETag/Last-Modified: las re-descargas son peticiones condicionales (304).
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+from services import http_client
+from utils.cache import load_cache_entry, save_cache
+from utils.tracing import traced, annotate, incr, bind_context
+
+MAX_BYTES = 1_500_000
+MAX_TEXT_CHARS = 8000
+MIN_BLOCK_CHARS = 40
+PER_HOST_LIMIT = 2
+PAGE_FRESHNESS = 60*60        # dentro de este tiempo no se toca la red
+PAGE_CACHE_TTL = 60*60*24*7   # validadores guardados para peticiones condicionales
+CHUNK_SIZE = 16384
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; LinkedInViralAI/1.0)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.1",
+}
+NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe"]
+BLOCK_TAGS = ["h1", "h2", "h3", "p", "li", "blockquote"]
+CHARSET_RE = re.compile(r'charset=["\']?([\w-]+)', re.I)
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+def page_cache_key(url):
+    return f"page_v1|{url}"
+
+def host_semaphore(url):
+    host = urlsplit(url).netloc.lower()
+    with _host_limits_lock:
+        sem = _host_limits.get(host)
+        if sem is None:
+            sem = _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+    return sem
+
+def _html_parser():
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+def extract_main_text(markup, encoding=None, max_chars=MAX_TEXT_CHARS):
+    """
+    Texto principal de una página: se descartan scripts/navegación/pies y se toman los bloques
+    de <article>/<main> (o <body>) con suficiente texto.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(markup, _html_parser(), from_encoding=encoding)
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    blocks, total = [], 0
+    for el in root.find_all(BLOCK_TAGS):
+        # un <li> que contiene párrafos se cubre con los propios <p>
+        if el.name == "li" and el.find("p"):
+            continue
+        text = " ".join(el.get_text(" ", strip=True).split())
+        if len(text) < MIN_BLOCK_CHARS and not el.name.startswith("h"):
+            continue
+        if not text:
+            continue
+        blocks.append(text)
+        total += len(text) + 1
+        if total >= max_chars:
+            break
+    return "\n".join(blocks)[:max_chars]
+
+def read_capped(resp, max_bytes=MAX_BYTES):
+    """Lee el cuerpo en streaming hasta max_bytes y cierra la conexión."""
+    chunks, size = [], 0
+    try:
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+    finally:
+        resp.close()
+    return b"".join(chunks)[:max_bytes]
+
+@traced("fetch_page")
+def fetch_page(url, max_bytes=MAX_BYTES, timeout=(5, 10), use_cache=True):
+    """
+    Retorna {'link','text','status'} o None si la página no es HTML o falla.
+    status: 'cached' (fresca, sin red), 'not_modified' (304) o 'fetched'.
+    """
+    key = page_cache_key(url)
+    entry = load_cache_entry(key, ttl_seconds=PAGE_CACHE_TTL) if use_cache else None
+    cached = entry[1] if entry else None
+    if entry and time.time() - entry[0] < PAGE_FRESHNESS:
+        annotate(status="cached")
+        return {"link": url, "text": cached["text"], "status": "cached"}
+
+    headers = dict(HEADERS)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with host_semaphore(url):
+        resp = http_client.get(url, headers=headers, timeout=timeout, retries=1, stream=True)
+        if resp.status_code == 304 and cached:
+            resp.close()
+            save_cache(key, cached, ttl_seconds=PAGE_CACHE_TTL)
+            annotate(status="not_modified")
+            return {"link": url, "text": cached["text"], "status": "not_modified"}
+        content_type = resp.headers.get("Content-Type", "")
+        if resp.status_code != 200 or "html" not in content_type.lower():
+            resp.close()
+            annotate(status=resp.status_code, content_type=content_type)
+            return None
+        body = read_capped(resp, max_bytes)
+
+    charset = CHARSET_RE.search(content_type)
+    text = extract_main_text(body, encoding=charset.group(1) if charset else None)
+    annotate(status="fetched", bytes=len(body), chars=len(text))
+    if use_cache:
+        save_cache(key, {
+            "text": text,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }, ttl_seconds=PAGE_CACHE_TTL)
+    return {"link": url, "text": text, "status": "fetched"}
+
+@traced("fetch_sources")
+def fetch_sources(urls, max_workers=8, timeout=10, max_bytes=MAX_BYTES, use_cache=True):
+    """
+    Descarga en paralelo las URLs (sin duplicados) y retorna las páginas con texto, en el orden de entrada.
+    - Como mucho PER_HOST_LIMIT conexiones simultáneas por host.
+    - timeout: deadline total en segundos; las páginas que no lleguen a tiempo se descartan.
+    """
+    urls = [u for u in dict.fromkeys(urls) if u and u.startswith(("http://", "https://"))]
+    if not urls:
+        return []
+    pages = [None] * len(urls)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    try:
+        futures = {executor.submit(bind_context(fetch_page), url, max_bytes, use_cache=use_cache): idx
+                   for idx, url in enumerate(urls)}
+        done, pending = wait(futures, timeout=timeout)
+        for fut in done:
+            try:
+                pages[futures[fut]] = fut.result()
+            except Exception as e:
+                print(f"Error descargando {urls[futures[fut]]}:", e)
+        if pending:
+            print(f"⏱️ {len(pending)} fuentes sin respuesta a tiempo, se omiten")
+    finally:
+        # igual que en run_queries: no esperar a las descargas lentas
+        executor.shutdown(wait=False, cancel_futures=True)
+    pages = [p for p in pages if p and p["text"]]
+    for page in pages:
+        incr(f"pages_{page['status']}")
+    annotate(requested=len(urls), pages=len(pages))
+    return pages
@@ -3,29 +3,365 @@ import os
 import json
 import re
 import time
+import sqlite3
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
+from utils.tracing import incr
 
 CACHE_DIR = os.getenv("CACHE_DIR", "./.cache")
 Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
 
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")  # sqlite | json
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", 60 * 60 * 24 * 7))
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", 256))
+CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL", 60 * 10))
+# los aciertos en memoria se propagan al último acceso del backend cada tantos segundos o claves
+CACHE_TOUCH_INTERVAL = 30
+CACHE_TOUCH_BATCH = 256
+
 def sanitize_filename(name):
     # Reemplaza todos los caracteres inválidos por "_"
     return re.sub(r'[\\/*?:"<>|]', "_", name)
 
-def save_cache(key, data):
-    name_file = sanitize_filename(key)
-    path = os.path.join(CACHE_DIR, f"{name_file}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump({"ts": time.time(), "data": data}, f, ensure_ascii=False, indent=2)
+def hash_key(key):
+    """Hash estable de la clave: evita colisiones y caracteres inválidos."""
+    return hashlib.sha256(str(key).encode("utf-8")).hexdigest()
 
-def load_cache(key, ttl_seconds=None):
-    name_file = sanitize_filename(key)
-    path = os.path.join(CACHE_DIR, f"{name_file}.json")
-    if not os.path.exists(path):
-        return None
-    with open(path, "r", encoding="utf-8") as f:
-        obj = json.load(f)
-    if ttl_seconds:
-        if time.time() - obj.get("ts",0) > ttl_seconds:
+# ==========================
+# 🔹 Backends
+# ==========================
+class CacheBackend(ABC):
+    """
+    Interfaz de backend de caché. Las entradas se guardan como JSON serializado.
+    - get(key) -> (ts, payload, expires_at) | None
+    - set(key, payload, ts, expires_at=None)
+    - delete(key)
+    - sweep(max_age) -> número de entradas eliminadas
+    - touch(accessed) -> marca último acceso {key: timestamp} (para backends con evicción LRU)
+    """
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, payload, ts, expires_at=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    def sweep(self, max_age=None):
+        return 0
+
+    def touch(self, accessed):
+        pass
+
+class MemoryLRUBackend(CacheBackend):
+    """Nivel en memoria del proceso, acotado por número de entradas."""
+
+    def __init__(self, max_items=CACHE_MEMORY_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            ts, payload, expires_at = entry
+            if expires_at and expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return ts, payload, expires_at
+
+    def set(self, key, payload, ts, expires_at=None):
+        with self._lock:
+            self._items[key] = (ts, payload, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def sweep(self, max_age=None):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (ts, _, exp) in self._items.items()
+                       if (exp and exp < now) or (max_age and now - ts > max_age)]
+            for k in expired:
+                del self._items[k]
+        return len(expired)
+
+class JsonFileBackend(CacheBackend):
+    """Backend original: un archivo JSON por clave en CACHE_DIR (sin evicción por tamaño)."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        if obj.get("expires_at") and obj["expires_at"] < time.time():
+            return None
+        return obj.get("ts", 0), obj.get("payload"), obj.get("expires_at")
+
+    def set(self, key, payload, ts, expires_at=None):
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump({"ts": ts, "expires_at": expires_at, "payload": payload}, f, ensure_ascii=False)
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+class SQLiteBackend(CacheBackend):
+    """
+    Backend SQLite en modo WAL con evicción por tamaño (LRU por último acceso)
+    y limpieza de entradas expiradas.
+    """
+
+    def __init__(self, db_path=None, max_bytes=CACHE_MAX_BYTES):
+        self.db_path = db_path or os.path.join(CACHE_DIR, "cache.sqlite")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                ts REAL NOT NULL,
+                expires_at REAL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed)")
+        self._conn.commit()
+        # total en bytes mantenido en memoria: evita un SUM(size) sobre toda la tabla en cada set
+        self._total = self._sum_sizes()
+
+    def _sum_sizes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _delete_key(self, key):
+        row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._total -= row[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, expires_at, payload FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            ts, expires_at, payload = row
+            now = time.time()
+            if expires_at and expires_at < now:
+                self._delete_key(key)
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return ts, payload, expires_at
+
+    def set(self, key, payload, ts, expires_at=None):
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            self._delete_key(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, ts, expires_at, accessed, size, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, ts, expires_at, ts, size, payload)
+            )
+            self._total += size
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._delete_key(key)
+            self._conn.commit()
+
+    def touch(self, accessed):
+        with self._lock:
+            self._conn.executemany("UPDATE cache SET accessed = MAX(accessed, ?) WHERE key = ?",
+                                   [(ts, key) for key, ts in accessed.items()])
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed ASC"):
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._total -= size
+            if self._total <= self.max_bytes:
+                break
+
+    def sweep(self, max_age=None):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM cache WHERE (expires_at IS NOT NULL AND expires_at < ?) OR (? IS NOT NULL AND ts < ?)",
+                (now, max_age, now - (max_age or 0))
+            )
+            self._conn.commit()
+            if cur.rowcount:
+                self._total = self._sum_sizes()
+            return cur.rowcount
+
+# ==========================
+# 🔹 Caché en niveles
+# ==========================
+class TieredCache:
+    """
+    Caché de dos niveles: LRU en memoria delante de un backend persistente.
+    Las claves se hashean y se cuentan aciertos/fallos.
+    Los aciertos en memoria se acumulan y se marcan en el backend por lotes (`touch`), para que
+    su evicción LRU no elimine justo las claves más usadas, que nunca llegan a leerse de él.
+    """
+
+    def __init__(self, backend, memory=None, max_age=CACHE_MAX_AGE, sweep_interval=CACHE_SWEEP_INTERVAL):
+        self.backend = backend
+        self.memory = memory or MemoryLRUBackend()
+        self.max_age = max_age
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "expired": 0}
+        self._stats_lock = threading.Lock()
+        self._touched = {}
+        self._touched_since = time.time()
+        self._sweeper = None
+        if sweep_interval:
+            self._start_sweeper(sweep_interval)
+
+    def _start_sweeper(self, interval):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print("Cache sweep error:", e)
+        self._sweeper = threading.Thread(target=loop, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def sweep(self):
+        self.flush_touches()
+        return self.memory.sweep(self.max_age) + self.backend.sweep(self.max_age)
+
+    def _touch(self, hkey):
+        now = time.time()
+        with self._stats_lock:
+            self._touched[hkey] = now
+            due = len(self._touched) >= CACHE_TOUCH_BATCH or now - self._touched_since >= CACHE_TOUCH_INTERVAL
+        if due:
+            self.flush_touches()
+
+    def flush_touches(self):
+        """Propaga al backend el último acceso de las claves leídas desde memoria."""
+        with self._stats_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_since = time.time()
+        if touched:
+            self.backend.touch(touched)
+
+    def _count(self, *names):
+        with self._stats_lock:
+            for name in names:
+                self.stats[name] += 1
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def get(self, key, ttl_seconds=None):
+        entry = self.get_entry(key, ttl_seconds=ttl_seconds)
+        return entry[1] if entry else None
+
+    def get_entry(self, key, ttl_seconds=None):
+        """Retorna (ts, data) para poder decidir frescura fuera de la caché."""
+        hkey = hash_key(key)
+        entry = self.memory.get(hkey)
+        from_memory = entry is not None
+        if entry is None:
+            entry = self.backend.get(hkey)
+        if entry is None:
+            self._count("misses")
             return None
-    return obj.get("data")
+        ts, payload, expires_at = entry
+        if ttl_seconds and time.time() - ts > ttl_seconds:
+            self._count("expired", "misses")
+            return None
+        if from_memory:
+            self._count("memory_hits", "hits")
+            self._touch(hkey)
+        else:
+            self.memory.set(hkey, payload, ts, expires_at)
+            self._count("hits")
+        return ts, json.loads(payload)
+
+    def set(self, key, data, ttl_seconds=None):
+        hkey = hash_key(key)
+        ts = time.time()
+        expires_at = ts + ttl_seconds if ttl_seconds else None
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        self.memory.set(hkey, payload, ts, expires_at)
+        self.backend.set(hkey, payload, ts, expires_at)
+
+    def delete(self, key):
+        hkey = hash_key(key)
+        self.memory.delete(hkey)
+        self.backend.delete(hkey)
+
+def build_backend(name=CACHE_BACKEND):
+    if name == "json":
+        return JsonFileBackend()
+    return SQLiteBackend()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredCache(build_backend())
+    return _cache
+
+def cache_stats():
+    return get_cache().stats_snapshot()
+
+# ==========================
+# 🔹 API compatible
+# ==========================
+def save_cache(key, data, ttl_seconds=None):
+    get_cache().set(key, data, ttl_seconds=ttl_seconds)
+
+def load_cache_entry(key, ttl_seconds=None):
+    """Como load_cache pero retorna (ts, data), o None."""
+    entry = get_cache().get_entry(key, ttl_seconds=ttl_seconds)
+    incr("cache_hits" if entry is not None else "cache_misses")
+    return entry
+
+def load_cache(key, ttl_seconds=None):
+    data = get_cache().get(key, ttl_seconds=ttl_seconds)
+    incr("cache_hits" if data is not None else "cache_misses")
+    return data
@@ -0,0 +1,81 @@
+# utils/embedding_cache.py
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.cache import CACHE_DIR
+
+DB_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite")
+
+def embedding_key(model, text):
+    """Clave direccionada por contenido: hash de modelo + texto."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Caché de embeddings en dos niveles:
+    - LRU en memoria (OrderedDict) para repeticiones dentro del mismo proceso.
+    - SQLite con vectores float32 en BLOB para persistir entre ejecuciones.
+    """
+
+    def __init__(self, db_path=DB_PATH, lru_size=4096):
+        self.db_path = db_path
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, dim INTEGER, vec BLOB)"
+        )
+        self._conn.commit()
+
+    def _remember(self, key, vec):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys):
+        """Retorna {key: vector} con los vectores encontrados."""
+        found = {}
+        missing = []
+        with self._lock:
+            for k in keys:
+                if k in self._lru:
+                    self._lru.move_to_end(k)
+                    found[k] = self._lru[k]
+                else:
+                    missing.append(k)
+            # SQLite limita el número de parámetros por consulta
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for k, blob in rows:
+                    vec = np.frombuffer(blob, dtype=np.float32)
+                    found[k] = vec
+                    self._remember(k, vec)
+        return found
+
+    def put_many(self, model, items):
+        """Guarda [(key, vector)] en disco y en memoria."""
+        with self._lock:
+            rows = []
+            for k, vec in items:
+                vec = np.asarray(vec, dtype=np.float32)
+                rows.append((k, model, vec.shape[0], vec.tobytes()))
+                self._remember(k, vec)
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+_cache = None
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
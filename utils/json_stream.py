@@ -0,0 +1,158 @@
+# utils/json_stream.py
+import json
+
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+REPLACEMENT_CHAR = "\ufffd"
+
+def join_surrogates(high, low):
+    """Une un par sustituto UTF-16 (p.ej. \\ud83d\\ude80 de un emoji) en un solo carácter."""
+    return (chr(high) + chr(low)).encode("utf-16", "surrogatepass").decode("utf-16")
+
+def strip_lone_surrogates(text):
+    """json.loads deja los \\uXXXX sustitutos sueltos tal cual; se reemplazan por U+FFFD."""
+    return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+class StreamingJsonObjectParser:
+    """
+    Parser incremental para un objeto JSON que llega por fragmentos (streaming de un LLM).
+    `feed(chunk)` devuelve eventos:
+    - ("delta", key, texto): fragmento decodificado de un valor string de primer nivel.
+    - ("field", key, valor): campo de primer nivel completo y ya parseado.
+    Ignora el texto antes del primer '{' (p.ej. ```json).
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode = None
+        self._high_surrogate = None
+        self._expect = "key"
+        self._key_chars = []
+        self._current_key = None
+        self._segment = []
+
+    def feed(self, chunk):
+        events = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            self._consume(ch, events)
+        return events
+
+    def _consume(self, ch, events):
+        top_level = self._depth == 1
+        if self._in_string:
+            self._segment.append(ch)
+            if top_level:
+                self._decode_string_char(ch, events)
+            elif self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+
+        if top_level and ch in ",}":
+            self._close_field(events)
+            if ch == "}":
+                self._depth = 0
+                self.done = True
+            return
+
+        self._segment.append(ch)
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+        elif ch == ":" and top_level:
+            self._expect = "value"
+
+    def _decode_string_char(self, ch, events):
+        """
+        Decodifica caracteres de un string de primer nivel (clave o valor).
+        Un sustituto alto (\\ud800-\\udbff) se retiene hasta que llega su mitad baja;
+        los sustitutos sueltos se emiten como U+FFFD para no llegar nunca a print().
+        """
+        text = None
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                try:
+                    text = self._decode_code_point(int(self._unicode, 16))
+                except ValueError:
+                    text = ""
+                self._unicode = None
+            return self._emit(text, events)
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+                return
+            text = ESCAPES.get(ch, ch)
+        elif ch == "\\":
+            self._escape = True
+            return
+        elif ch == '"':
+            self._emit(self._flush_surrogate(), events)
+            self._in_string = False
+            if self._expect == "key":
+                self._current_key = "".join(self._key_chars)
+                self._key_chars = []
+            return
+        else:
+            text = ch
+        self._emit(self._flush_surrogate() + text, events)
+
+    def _decode_code_point(self, code):
+        high, self._high_surrogate = self._high_surrogate, None
+        if 0xDC00 <= code <= 0xDFFF:
+            return join_surrogates(high, code) if high is not None else REPLACEMENT_CHAR
+        prefix = REPLACEMENT_CHAR if high is not None else ""
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return prefix
+        return prefix + chr(code)
+
+    def _flush_surrogate(self):
+        """Un sustituto alto pendiente que no recibió su mitad baja se emite como U+FFFD."""
+        if self._high_surrogate is None:
+            return ""
+        self._high_surrogate = None
+        return REPLACEMENT_CHAR
+
+    def _emit(self, text, events):
+        if not text:
+            return
+        if self._expect == "key":
+            self._key_chars.append(text)
+        else:
+            events.append(("delta", self._current_key, text))
+
+    def _close_field(self, events):
+        segment = "".join(self._segment).strip()
+        self._segment = []
+        self._expect = "key"
+        self._current_key = None
+        if not segment:
+            return
+        try:
+            parsed = json.loads("{" + segment + "}")
+        except json.JSONDecodeError:
+            return
+        for key, value in parsed.items():
+            if isinstance(value, str):
+                value = strip_lone_surrogates(value)
+            self.fields[key] = value
+            events.append(("field", key, value))
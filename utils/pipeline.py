@@ -0,0 +1,53 @@
+# utils/pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.tracing import span, bind_context
+
+class Stage:
+    """
+    Etapa del pipeline: `fn` recibe un dict con los resultados de sus dependencias (`deps`).
+    """
+
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+def run_stages(stages, max_workers=4):
+    """
+    Ejecuta un DAG de etapas: cada etapa arranca en cuanto sus dependencias terminan,
+    y las independientes corren en paralelo.
+    Retorna (resultados por etapa, segundos por etapa). Si una etapa falla se propaga el error.
+    """
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Etapa '{s.name}' depende de etapas inexistentes: {missing}")
+
+    results, timings = {}, {}
+    pending = dict(by_name)
+    running = {}
+
+    def timed(stage, inputs):
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{stage.name}"):
+                return stage.fn(inputs)
+        finally:
+            timings[stage.name] = round(time.perf_counter() - start, 3)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(d in results for d in stage.deps):
+                    inputs = {d: results[d] for d in stage.deps}
+                    running[pool.submit(bind_context(timed), stage, inputs)] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Dependencias circulares entre etapas: {list(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name] = fut.result()
+    return results, timings
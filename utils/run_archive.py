@@ -0,0 +1,195 @@
+# utils/run_archive.py
+import os
+import glob
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+RUN_ARCHIVE_PATH = os.getenv("RUN_ARCHIVE_PATH", "data/runs.sqlite")
+
+def _dumps(obj, sort_keys=False):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"), default=str)
+
+def _pack(obj):
+    return zlib.compress(_dumps(obj).encode("utf-8"), 6)
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+class RunArchive:
+    """
+    Archivo de ejecuciones append-only en SQLite:
+    - `snapshots`: perfil, top posts y filas de hooks, comprimidos y guardados una sola vez por hash.
+    - `runs`: una fila por ejecución con el resto del resultado comprimido y referencias a snapshots.
+    - índices por fecha, plantilla e ids de hooks para listar y buscar sin leer los payloads.
+    - `runs_topic_fts`: índice FTS5 de trigramas sobre el tema para buscar por subcadena
+      (si el SQLite local no trae FTS5/trigram, la búsqueda por tema recorre la tabla con LIKE).
+    """
+
+    def __init__(self, path=RUN_ARCHIVE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS snapshots (hash TEXT PRIMARY KEY, kind TEXT, payload BLOB);
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created TEXT NOT NULL,
+                topic TEXT,
+                template TEXT,
+                title TEXT,
+                profile_ref TEXT,
+                top_posts_ref TEXT,
+                payload BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created);
+            CREATE INDEX IF NOT EXISTS idx_runs_topic ON runs(topic);
+            CREATE INDEX IF NOT EXISTS idx_runs_template ON runs(template);
+            CREATE TABLE IF NOT EXISTS run_hooks (run_id INTEGER, hook_id TEXT);
+            CREATE INDEX IF NOT EXISTS idx_run_hooks_hook ON run_hooks(hook_id);
+            CREATE INDEX IF NOT EXISTS idx_run_hooks_run ON run_hooks(run_id);
+        """)
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS runs_topic_fts USING fts5(topic, tokenize='trigram')"
+            )
+            # archivos creados antes del índice: se indexan las ejecuciones que falten
+            self._conn.execute(
+                "INSERT INTO runs_topic_fts (rowid, topic) SELECT id, topic FROM runs "
+                "WHERE topic IS NOT NULL AND id > (SELECT COALESCE(MAX(rowid), 0) FROM runs_topic_fts)"
+            )
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        self._conn.commit()
+
+    def _snapshot(self, kind, obj):
+        digest = hashlib.sha256(_dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()
+        self._conn.execute("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?)", (digest, kind, _pack(obj)))
+        return digest
+
+    def _load_snapshot(self, digest):
+        row = self._conn.execute("SELECT payload FROM snapshots WHERE hash = ?", (digest,)).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def save(self, result, created=None):
+        """Guarda un resultado de run_flow. Retorna el id de la ejecución."""
+        result = dict(result)
+        profile = result.pop("profile", None)
+        performance = dict(result.get("performance") or {})
+        top_posts = performance.pop("top_posts", None)
+        result["performance"] = performance
+        hooks = []
+        with self._lock:
+            for h in result.get("hooks") or []:
+                h = dict(h)
+                if "meta" in h:
+                    h["meta"] = {"$ref": self._snapshot("hook_meta", h["meta"])}
+                hooks.append(h)
+            result["hooks"] = hooks
+            profile_ref = self._snapshot("profile", profile) if profile is not None else None
+            top_posts_ref = self._snapshot("top_posts", top_posts) if top_posts is not None else None
+            script = result.get("script") or {}
+            cur = self._conn.execute(
+                "INSERT INTO runs (created, topic, template, title, profile_ref, top_posts_ref, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (created or datetime.now().isoformat(timespec="seconds"),
+                 (result.get("research") or {}).get("topic"), result.get("template"),
+                 script.get("title") if isinstance(script, dict) else None,
+                 profile_ref, top_posts_ref, _pack(result))
+            )
+            run_id = cur.lastrowid
+            topic = (result.get("research") or {}).get("topic")
+            if self._fts and topic is not None:
+                self._conn.execute("INSERT INTO runs_topic_fts (rowid, topic) VALUES (?, ?)", (run_id, topic))
+            self._conn.executemany("INSERT INTO run_hooks VALUES (?, ?)",
+                                   [(run_id, str(h.get("id"))) for h in hooks])
+            self._conn.commit()
+        return run_id
+
+    def load(self, run_id):
+        """Reconstruye el resultado completo de una ejecución."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created, profile_ref, top_posts_ref, payload FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            created, profile_ref, top_posts_ref, payload = row
+            result = _unpack(payload)
+            if profile_ref:
+                result["profile"] = self._load_snapshot(profile_ref)
+            if top_posts_ref:
+                result.setdefault("performance", {})["top_posts"] = self._load_snapshot(top_posts_ref)
+            for h in result.get("hooks") or []:
+                ref = (h.get("meta") or {}).get("$ref") if isinstance(h.get("meta"), dict) else None
+                if ref:
+                    h["meta"] = self._load_snapshot(ref)
+        result["run_id"] = run_id
+        result["created"] = created
+        return result
+
+    def list(self, limit=20, topic=None, template=None, hook_id=None, since=None, until=None):
+        """
+        Lista ejecuciones (más recientes primero) usando solo columnas indexadas.
+        `topic` busca por subcadena sin distinguir mayúsculas; con FTS5 usa el índice de trigramas
+        cuando el texto tiene al menos 3 caracteres.
+        """
+        sql = "SELECT r.id, r.created, r.topic, r.template, r.title FROM runs r"
+        where, params = [], []
+        if hook_id is not None:
+            sql += " JOIN run_hooks h ON h.run_id = r.id"
+            where.append("h.hook_id = ?")
+            params.append(str(hook_id))
+        if topic:
+            if self._fts:
+                where.append("r.id IN (SELECT rowid FROM runs_topic_fts WHERE topic LIKE ?)")
+            else:
+                where.append("r.topic LIKE ?")
+            params.append(f"%{topic}%")
+        if template:
+            where.append("r.template = ?")
+            params.append(template)
+        if since:
+            where.append("r.created >= ?")
+            params.append(since)
+        if until:
+            where.append("r.created < ?")
+            params.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.created DESC, r.id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(("id", "created", "topic", "template", "title"), r)) for r in rows]
+
+    def import_json_files(self, pattern="output_run_*.json"):
+        """Importa los output_run_<timestamp>.json antiguos. Retorna cuántos se importaron."""
+        imported = 0
+        for path in sorted(glob.glob(pattern)):
+            stamp = os.path.basename(path)[len("output_run_"):-len(".json")]
+            try:
+                created = datetime.strptime(stamp, "%Y%m%d_%H%M%S").isoformat()
+            except ValueError:
+                created = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+            with self._lock:
+                exists = self._conn.execute("SELECT 1 FROM runs WHERE created = ?", (created,)).fetchone()
+            if exists:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                self.save(json.load(f), created=created)
+            imported += 1
+        return imported
+
+_archive = None
+
+def get_run_archive():
+    global _archive
+    if _archive is None:
+        _archive = RunArchive()
+    return _archive
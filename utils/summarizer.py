@@ -0,0 +1,176 @@
+# utils/summarizer.py
+"""
+Resumen extractivo de snippets/páginas de investigación.
+- Oraciones casi duplicadas (SimHash de 64 bits, distancia de Hamming) se descartan antes de rankear.
+- Ranking TextRank sobre la similitud coseno TF-IDF, calculada como producto de matrices dispersas
+  (scipy.sparse si está instalado; si no, numpy denso con el mismo código).
+- La selección se ajusta a un presupuesto de tokens (el tamaño del resumen anterior, ~150)
+  y se devuelve en el orden original.
+- Sin oraciones candidatas (solo snippets cortos) se devuelven los snippets tal cual, recortados al presupuesto.
+"""
+import hashlib
+import math
+import re
+import numpy as np
+from utils.text_utils import iter_ngrams, normalize_text
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+MIN_SENTENCE_WORDS = 6
+MAX_SENTENCE_WORDS = 60
+MAX_CANDIDATES = 600
+SIMHASH_MAX_DISTANCE = 4
+REDUNDANCY_THRESHOLD = 0.5
+DAMPING = 0.85
+DEFAULT_TOKEN_BUDGET = 150
+
+def estimate_tokens(text):
+    """Aproximación barata (~4 caracteres por token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+def split_sentences(texts, max_candidates=MAX_CANDIDATES):
+    """
+    Oraciones candidatas sin repetidos exactos. Si pasan de max_candidates se toma una muestra
+    repartida a lo largo de la entrada (no solo las primeras), en el orden original.
+    """
+    seen = {}
+    for text in texts:
+        for s in SENTENCE_SPLIT_RE.split(text or ""):
+            s = normalize_text(s)
+            if MIN_SENTENCE_WORDS <= len(s.split()) <= MAX_SENTENCE_WORDS:
+                seen.setdefault(s.lower(), s)
+    sentences = list(seen.values())
+    if len(sentences) > max_candidates:
+        picks = np.linspace(0, len(sentences) - 1, max_candidates).round().astype(int)
+        sentences = [sentences[i] for i in picks]
+    return sentences
+
+def truncate_to_budget(texts, max_tokens):
+    """Une los textos y corta en el último espacio antes de ~max_tokens."""
+    text = " ".join(normalize_text(t) for t in texts if t and t.strip())
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit + 1)
+    return text[:cut if cut > 0 else limit].rstrip()
+
+def _token_hash(token, memo):
+    h = memo.get(token)
+    if h is None:
+        h = memo[token] = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return h
+
+def simhash(token_lists):
+    """Huella SimHash de 64 bits (np.uint64) por lista de tokens."""
+    memo = {}
+    out = np.zeros(len(token_lists), dtype=np.uint64)
+    for i, tokens in enumerate(token_lists):
+        if not tokens:
+            continue
+        hashes = np.array([_token_hash(t, memo) for t in tokens], dtype=np.uint64)
+        bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        votes = (2 * bits.astype(np.int32) - 1).sum(axis=0)
+        out[i] = np.packbits(votes > 0, bitorder="little").view(np.uint64)[0]
+    return out
+
+def popcount(values):
+    """Bits en 1 por elemento de un array uint64 (np.bitwise_count requiere numpy >= 2)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    bits = np.unpackbits(np.ascontiguousarray(values).view(np.uint8).reshape(*values.shape, 8), axis=-1)
+    return bits.sum(axis=-1)
+
+def near_duplicate_mask(fingerprints, max_distance=SIMHASH_MAX_DISTANCE, empty=None):
+    """
+    True para las oraciones que se conservan (la primera de cada grupo de casi duplicados).
+    `empty` marca las oraciones sin tokens: su huella es 0 sin ser parecidas entre sí,
+    así que se conservan y no se comparan con ninguna.
+    """
+    n = len(fingerprints)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    distances = popcount(fingerprints[:, None] ^ fingerprints[None, :])
+    near = distances <= max_distance
+    if empty is not None:
+        empty = np.asarray(empty, dtype=bool)
+        near[empty, :] = False
+        near[:, empty] = False
+    keep = np.ones(n, dtype=bool)
+    for i in range(1, n):
+        if (near[i, :i] & keep[:i]).any():
+            keep[i] = False
+    return keep
+
+def tfidf_matrix(token_lists):
+    """Matriz TF-IDF (filas normalizadas L2) en formato CSR, o densa si no hay scipy."""
+    vocab = {}
+    rows, cols, vals = [], [], []
+    for i, tokens in enumerate(token_lists):
+        counts = {}
+        for t in tokens:
+            j = vocab.setdefault(t, len(vocab))
+            counts[j] = counts.get(j, 0) + 1
+        rows.extend([i] * len(counts))
+        cols.extend(counts.keys())
+        vals.extend(counts.values())
+    shape = (len(token_lists), max(1, len(vocab)))
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    vals = np.log1p(np.array(vals, dtype=np.float64))
+    df = np.bincount(cols, minlength=shape[1])
+    vals *= (np.log((1 + shape[0]) / (1 + df)) + 1)[cols]
+    norms = np.sqrt(np.bincount(rows, weights=vals ** 2, minlength=shape[0]))
+    vals /= np.where(norms > 0, norms, 1)[rows]
+    try:
+        from scipy.sparse import csr_matrix
+        return csr_matrix((vals, (rows, cols)), shape=shape)
+    except ImportError:
+        dense = np.zeros(shape)
+        dense[rows, cols] = vals
+        return dense
+
+def textrank(similarity, damping=DAMPING, max_iter=50, tol=1e-6):
+    """PageRank sobre el grafo de similitud (matriz densa n x n con diagonal en cero)."""
+    n = similarity.shape[0]
+    out_weight = similarity.sum(axis=1)
+    # las oraciones sin vecinos reparten su peso uniformemente
+    transition = np.where(out_weight[:, None] > 0, similarity / np.where(out_weight > 0, out_weight, 1)[:, None], 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def summarize(texts, max_sentences=6, max_tokens=DEFAULT_TOKEN_BUDGET):
+    """
+    Resumen extractivo: como mucho max_sentences oraciones y max_tokens tokens (aprox.),
+    elegidas por TextRank sin casi duplicados ni oraciones redundantes entre sí.
+    Si ninguna oración califica, se devuelven los textos recortados a max_tokens.
+    """
+    sentences = split_sentences(texts)
+    if not sentences:
+        return truncate_to_budget(texts, max_tokens)
+    token_lists = [iter_ngrams(s, 1) for s in sentences]
+    keep = near_duplicate_mask(simhash(token_lists), empty=[not t for t in token_lists])
+    sentences = [s for s, k in zip(sentences, keep) if k]
+    token_lists = [t for t, k in zip(token_lists, keep) if k]
+
+    matrix = tfidf_matrix(token_lists)
+    similarity = matrix @ matrix.T
+    similarity = np.asarray(similarity.toarray() if hasattr(similarity, "toarray") else similarity)
+    np.fill_diagonal(similarity, 0.0)
+    scores = textrank(similarity)
+
+    chosen, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        if chosen and similarity[i, chosen].max() > REDUNDANCY_THRESHOLD:
+            continue
+        chosen.append(int(i))
+        used += cost
+        if len(chosen) >= max_sentences:
+            break
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -8,16 +8,64 @@ def normalize_text(s: str):
     s = re.sub(r'\s+', ' ', s).strip()
     return s
 
-def extract_common_words(texts, top_n=20, stopwords=None):
-    tokens = []
+TOKEN_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+de la el y en a con que para los las un una mi me se es al del lo por su sus como más mas pero
+sin sobre este esta esto estos estas ese esa eso entre cuando muy también tambien hay ser son fue
+nos les le ya o u no si sí porque qué que cómo cual cuál hasta desde donde todo todos todas otro
+otra tu tus te yo él ella ellos ellas
+the and for are but not you your with this that from have has was were will would can could
+our out all any its it's into about than then them they their there what when which who how
+why been being also just more most some such only own very
+""".split())
+
+def tokenize(text):
+    """Tokens (en minúscula) de un solo texto; el costo de memoria queda acotado al texto."""
+    return TOKEN_RE.findall(text.lower())
+
+def iter_ngrams(text, n, stopwords=STOPWORDS, min_len=3):
+    """
+    N-gramas de un texto. Para n=1 filtra stopwords y palabras cortas;
+    para n>1 descarta los n-gramas que empiezan o terminan en stopword o palabra corta.
+    """
+    tokens = tokenize(text)
+    if n == 1:
+        return [w for w in tokens if len(w) >= min_len and w not in stopwords]
+    return [
+        " ".join(gram) for gram in zip(*(tokens[i:] for i in range(n)))
+        if len(gram[0]) >= min_len and len(gram[-1]) >= min_len
+        and gram[0] not in stopwords and gram[-1] not in stopwords
+    ]
+
+def count_words(texts, stopwords=None, ngram=1, min_len=3):
+    """
+    Cuenta palabras (o n-gramas si ngram>1) sin acumular todos los tokens del corpus en memoria.
+    Para palabras sueltas se cuentan primero los fragmentos separados por espacios (str.split y
+    Counter, ambos en C); minúsculas, regex y filtro de stopwords se aplican después una sola vez
+    por fragmento distinto. Como \\w+ nunca cruza espacios, el resultado es el mismo que tokenizar
+    cada texto. Los n-gramas se cuentan texto a texto para no unir palabras de posts distintos.
+    """
+    stopwords = STOPWORDS if not stopwords else stopwords
+    counter = Counter()
+    if ngram != 1:
+        for t in texts:
+            if t:
+                counter.update(iter_ngrams(t, ngram, stopwords, min_len))
+        return counter
+
+    pieces = Counter()
     for t in texts:
-        t = re.sub(r'[^\w\s]', ' ', t.lower())
-        tokens += t.split()
-    if not stopwords:
-        stopwords = set(["de","la","el","y","en","a","con","que","para","los","las","un","una","mi","me","se","es","al"])
-    filtered = [w for w in tokens if w not in stopwords and len(w)>2]
-    c = Counter(filtered)
-    return c.most_common(top_n)
+        if t:
+            pieces.update(t.split())
+    for piece, c in pieces.items():
+        for w in TOKEN_RE.findall(piece.lower()):
+            if len(w) >= min_len and w not in stopwords:
+                counter[w] += c
+    return counter
+
+def extract_common_words(texts, top_n=20, stopwords=None, ngram=1):
+    return count_words(texts, stopwords=stopwords, ngram=ngram).most_common(top_n)
 
 def ask_option(prompt, options, default=None):
     print(f"\n{prompt}")
@@ -0,0 +1,177 @@
+# utils/tracing.py
+"""
+Instrumentación ligera por etapa: spans con tiempo de pared y atributos
+(bytes, tokens, aciertos de caché...). Un `Trace` agrupa los spans de una ejecución
+y se guarda con la ejecución en el archivo de ejecuciones (utils/run_archive.py); opcionalmente se exportan como spans de OpenTelemetry
+a un archivo local (TRACE_OTEL_FILE).
+"""
+import os
+import time
+import uuid
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+TRACE_OTEL_FILE = os.getenv("TRACE_OTEL_FILE")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    def __init__(self, name, parent_id=None, attrs=None):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = dict(attrs or {})
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+class Trace:
+    """Colección de spans de una ejecución (thread-safe)."""
+
+    def __init__(self, name="run"):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {"trace_id": self.id, "name": self.name, "spans": [s.to_dict() for s in spans]}
+
+    def summary(self):
+        """Tiempo total por nombre de span."""
+        totals = {}
+        for s in self.to_dict()["spans"]:
+            totals[s["name"]] = round(totals.get(s["name"], 0) + s["duration_ms"], 2)
+        return totals
+
+@contextmanager
+def start_trace(name="run"):
+    """
+    Activa un Trace para el contexto actual (y los hilos lanzados con `bind_context`).
+    Si ya hay uno activo se reutiliza, para que un run_flow dentro de otro trace no lo oculte.
+    """
+    active = _current_trace.get()
+    if active is not None:
+        with span(name):
+            yield active
+        return
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if TRACE_OTEL_FILE:
+            export_otel(trace, TRACE_OTEL_FILE)
+
+@contextmanager
+def span(name, **attrs):
+    """Mide un bloque. Sin Trace activo no registra nada (costo casi nulo)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    sp = Span(name, parent.id if parent else None, attrs)
+    token = _current_span.set(sp)
+    t0 = time.perf_counter()
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        sp.duration = time.perf_counter() - t0
+        _current_span.reset(token)
+        trace.add(sp)
+
+def record(name, start, duration, **attrs):
+    """Registra un span ya medido (útil en generadores, donde no conviene cambiar el span actual)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    sp = Span(name, parent.id if parent else None, attrs)
+    sp.start = start
+    sp.duration = duration
+    trace.add(sp)
+
+def traced(name=None):
+    """Decorador: ejecuta la función dentro de un span."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def annotate(**attrs):
+    """Agrega atributos al span actual."""
+    sp = _current_span.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
+
+def incr(key, amount=1):
+    """Incrementa un contador en el span actual (p.ej. cache_hits)."""
+    sp = _current_span.get()
+    if sp is not None:
+        sp.attrs[key] = sp.attrs.get(key, 0) + amount
+
+def bind_context(fn):
+    """Propaga el trace/span actual a otro hilo (ThreadPoolExecutor no copia contextvars)."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+def export_otel(trace, path):
+    """Exporta el trace como spans de OpenTelemetry (JSON) a un archivo. Requiere opentelemetry-sdk."""
+    try:
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("⚠️ opentelemetry-sdk no está instalado; no se exporta el trace.")
+        return
+    with open(path, "a", encoding="utf-8") as out:
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter(out=out)))
+        tracer = provider.get_tracer("linkedin_post")
+        otel_spans = {}
+        for s in sorted(trace.spans, key=lambda s: s.start):
+            parent = otel_spans.get(s.parent_id)
+            ctx = otel_trace.set_span_in_context(parent) if parent else None
+            start_ns = int(s.start * 1e9)
+            otel_span = tracer.start_span(s.name, context=ctx, start_time=start_ns,
+                                          attributes={k: v for k, v in s.attrs.items()
+                                                      if isinstance(v, (str, bool, int, float))})
+            otel_spans[s.id] = otel_span
+        # se cierran al final para que los hijos existan antes que el padre termine
+        for s in trace.spans:
+            otel_spans[s.id].end(end_time=int((s.start + (s.duration or 0)) * 1e9))
+        provider.shutdown()
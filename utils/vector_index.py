@@ -0,0 +1,122 @@
+# utils/vector_index.py
+import os
+import json
+import hashlib
+import numpy as np
+from utils.cache import CACHE_DIR
+
+def content_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+def normalize_rows(mat):
+    mat = np.asarray(mat, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+class VectorIndex:
+    """
+    Índice vectorial persistente en disco:
+    - `<name>.npy`: matriz float32 (n, dim) con vectores ya normalizados (se abre con mmap).
+    - `<name>.manifest.json`: ids en el orden de las filas + hash de contenido por id.
+    Solo se recalculan embeddings de filas nuevas o modificadas.
+    `dim` (opcional) es la dimensión esperada: una matriz persistida con otra dimensión se reconstruye.
+    """
+
+    def __init__(self, name, index_dir=CACHE_DIR, embed_fn=None, dim=None):
+        self.name = name
+        self.embed_fn = embed_fn
+        self.dim = dim
+        self.matrix_path = os.path.join(index_dir, f"{name}.npy")
+        self.manifest_path = os.path.join(index_dir, f"{name}.manifest.json")
+        self.ids = []
+        self.hashes = {}
+        self.matrix = None
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.manifest_path)):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            if matrix.shape[0] != len(manifest.get("ids", [])):
+                return
+            self.ids = manifest["ids"]
+            self.hashes = manifest.get("hashes", {})
+            self.matrix = matrix
+        except Exception as e:
+            print(f"⚠️ Índice {self.name} corrupto, se reconstruirá: {e}")
+
+    def _save(self):
+        tmp_matrix = self.matrix_path + ".tmp.npy"
+        np.save(tmp_matrix, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(tmp_matrix, self.matrix_path)
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "hashes": self.hashes}, f, ensure_ascii=False)
+        os.replace(tmp_manifest, self.manifest_path)
+        # reabrir en modo mmap para no duplicar la matriz en memoria
+        self.matrix = np.load(self.matrix_path, mmap_mode="r")
+
+    def sync(self, ids, texts, embed_fn=None):
+        """
+        Sincroniza el índice con (ids, texts). Llama a `embed_fn` solo con los textos nuevos o cambiados.
+        Retorna el número de filas re-embebidas.
+        """
+        embed_fn = embed_fn or self.embed_fn
+        if self.matrix is not None and self.dim and self.matrix.shape[1] != self.dim:
+            # matriz de otro modelo (p.ej. un fallback antiguo): se reconstruye todo
+            print(f"⚠️ Índice {self.name} con dimensión {self.matrix.shape[1]} != {self.dim}, se reconstruirá")
+            self.ids, self.hashes, self.matrix = [], {}, None
+        ids = [str(i) for i in ids]
+        new_hashes = {i: content_hash(t) for i, t in zip(ids, texts)}
+        row_of = {i: r for r, i in enumerate(self.ids)}
+        stale = [k for k, i in enumerate(ids)
+                 if i not in row_of or self.hashes.get(i) != new_hashes[i]]
+
+        if not stale and ids == self.ids:
+            return 0
+
+        fresh = None
+        if stale:
+            fresh = normalize_rows(embed_fn([texts[k] for k in stale]))
+        dim = fresh.shape[1] if fresh is not None else self.matrix.shape[1]
+        if self.matrix is not None and self.matrix.shape[1] != dim:
+            # cambió el modelo de embeddings: se reconstruye todo
+            self.ids, self.hashes, self.matrix = [], {}, None
+            return self.sync(ids, texts, embed_fn)
+
+        matrix = np.empty((len(ids), dim), dtype=np.float32)
+        stale_pos = {k: j for j, k in enumerate(stale)}
+        for k, i in enumerate(ids):
+            if k in stale_pos:
+                matrix[k] = fresh[stale_pos[k]]
+            else:
+                matrix[k] = self.matrix[row_of[i]]
+
+        self.ids = ids
+        self.hashes = new_hashes
+        self.matrix = matrix
+        self._save()
+        return len(stale)
+
+    def query_text(self, text, k=3):
+        """Embebe `text` con el mismo embed_fn del índice y retorna los k más similares."""
+        return self.query(self.embed_fn([text])[0], k=k)
+
+    def query(self, vector, k=3):
+        """Retorna [(fila, similitud)] de los k vectores más similares (coseno), ordenados."""
+        if self.matrix is None or not len(self.ids):
+            return []
+        q = normalize_rows(vector)[0]
+        if q.shape[0] != self.matrix.shape[1]:
+            raise ValueError(f"Dimensión {q.shape[0]} no coincide con el índice {self.name} ({self.matrix.shape[1]})")
+        sims = self.matrix @ q
+        k = min(k, sims.shape[0])
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(i), float(sims[i])) for i in top]